@@ -0,0 +1,236 @@
+# End-to-end Throughput Benchmark (offline)
+# Save as: benchmark.py
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from cassette import Cassette
+from digital_agent import SimpleProductAgent
+from fake_anthropic import FakeAnthropicServer, load_payloads
+from fonts import shared_fonts
+from image_layers import shared_layers
+from journal import CycleJournal
+from parallel_render import ImageRenderPool
+from rate_limiter import RateLimiter
+from render_pipeline import ProductRenderer
+from work_queue import Budget
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    """Peak resident set size so far, in MB: this process, or its largest finished child"""
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class PipelineBenchmark:
+    """Run full cycles (LLM -> PDF -> images) against a local fake API and time them"""
+
+    def __init__(self, server, cycles=3, products=3, concurrency=0, stream=False,
+                 structured=False, images=True, pdf=True, workdir=None, verbose=False,
+                 cassette=None, render_workers=0):
+        self.server = server
+        self.cycles = cycles
+        self.products = products
+        self.concurrency = concurrency
+        self.stream = stream
+        self.structured = structured
+        self.workdir = workdir or tempfile.mkdtemp(prefix="benchmark_")
+        self.verbose = verbose
+        # A replay cassette makes the LLM stage instant and identical on every run
+        self.cassette = cassette
+
+        self.cycle_seconds = []
+        # With render_workers, each cycle's images render as one batch on a process pool
+        self.image_pool = ImageRenderPool(render_workers) if render_workers and images else None
+        self.renderer = ProductRenderer(pdf=pdf, images=images, image_pool=self.image_pool)
+        self.stage_seconds = dict(llm=[], **self.renderer.timings)
+        self.product_count = 0
+
+    def quiet(self):
+        """Swallow the agents' progress prints unless running verbose"""
+        return contextlib.nullcontext() if self.verbose else contextlib.redirect_stdout(io.StringIO())
+
+    def timed(self, stage, call, *args, **kwargs):
+        started = time.perf_counter()
+        result = call(*args, **kwargs)
+        self.stage_seconds[stage].append(time.perf_counter() - started)
+        return result
+
+    def run_llm(self, agent, journal_path):
+        journal = CycleJournal(journal_path)
+        budget = Budget(max_products=self.products)
+        if self.concurrency > 0:
+            agent.run_concurrent_cycle(self.concurrency, self.stream, journal, budget)
+        else:
+            agent.run_full_cycle(journal, budget)
+
+    def run_cycle(self, agent, number):
+        cycle_dir = os.path.join(self.workdir, f"cycle_{number}")
+        os.makedirs(cycle_dir, exist_ok=True)
+        journal_path = os.path.join(cycle_dir, "cycle.journal.jsonl")
+        started = time.perf_counter()
+
+        previous = os.getcwd()
+        os.chdir(cycle_dir)  # results and metrics files land next to the journal
+        try:
+            with self.quiet():
+                self.timed("llm", self.run_llm, agent, journal_path)
+                journal = CycleJournal(journal_path)
+                items = [(complete_product, os.path.join(cycle_dir, f"product_{n}"), None)
+                         for n, complete_product in enumerate(journal.complete_products())]
+                self.renderer.render_batch(items)
+                count = len(items)
+                journal.close()
+        finally:
+            os.chdir(previous)
+
+        elapsed = time.perf_counter() - started
+        self.cycle_seconds.append(elapsed)
+        self.product_count += count
+        print(f"⏱️ Cycle {number}: {count} products in {elapsed:.2f}s")
+
+    def run(self):
+        """Run every cycle and return the benchmark summary"""
+        # A generous limiter: the benchmark measures the pipeline, not the account tier
+        agent_args = dict(base_url=self.server.base_url, structured_output=self.structured,
+                          rate_limiter=RateLimiter(requests_per_minute=100000,
+                                                   tokens_per_minute=100000000),
+                          cassette=self.cassette)
+        with self.quiet():
+            agent = SimpleProductAgent("benchmark-key", **agent_args)
+
+        started = time.perf_counter()
+        for number in range(1, self.cycles + 1):
+            self.run_cycle(agent, number)
+        total = time.perf_counter() - started
+        if self.cassette is not None:
+            self.cassette.save()
+        if self.image_pool is not None:
+            self.image_pool.close()
+
+        return {
+            "cycles": self.cycles,
+            "products": self.product_count,
+            "total_seconds": round(total, 3),
+            "products_per_minute": round(self.product_count / total * 60, 2) if total else 0.0,
+            "cycle_latency_seconds": {
+                "p50": round(percentile(self.cycle_seconds, 50), 3),
+                "p95": round(percentile(self.cycle_seconds, 95), 3),
+                "max": round(max(self.cycle_seconds, default=0.0), 3)
+            },
+            "stage_seconds": {
+                stage: {"total": round(sum(times), 3),
+                        "p50": round(percentile(times, 50), 3),
+                        "p95": round(percentile(times, 95), 3)}
+                for stage, times in self.stage_seconds.items() if times
+            },
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            # Render workers are reaped when the pool closes above, so they are counted here
+            "peak_child_rss_mb": round(peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+            "fonts": shared_fonts().stats(),
+            "layers": shared_layers().stats(),
+            "api_requests": self.server.request_count,
+            "injected_errors": dict(self.server.injected),
+            "llm": agent.metrics.summary()["stages"],
+            "workdir": self.workdir
+        }
+
+
+def print_summary(summary):
+    print("\n📊 BENCHMARK RESULTS")
+    print("=" * 40)
+    print(f"📦 {summary['products']} products in {summary['cycles']} cycles "
+          f"({summary['total_seconds']}s)")
+    print(f"🚀 Throughput: {summary['products_per_minute']} products/minute")
+    latency = summary['cycle_latency_seconds']
+    print(f"⏱️ Cycle latency: p50 {latency['p50']}s, p95 {latency['p95']}s, max {latency['max']}s")
+    for stage, times in summary['stage_seconds'].items():
+        print(f"   • {stage}: {times['total']}s total, p50 {times['p50']}s, p95 {times['p95']}s")
+    print(f"🧠 Peak RSS: {summary['peak_rss_mb']} MB "
+          f"(largest worker process: {summary['peak_child_rss_mb']} MB)")
+    fonts = summary['fonts']
+    print(f"🔤 Fonts: {fonts['loads']} loads, {fonts['hits']} cache hits ({fonts['resolved']})")
+    layers = summary['layers']
+    print(f"🖼️ Static layers: {layers['renders']} drawn, {layers['hits']} reused")
+    print(f"🌐 API requests: {summary['api_requests']} "
+          f"(injected 429: {summary['injected_errors'][429]}, 529: {summary['injected_errors'][529]})")
+    print(f"📁 Outputs in: {summary['workdir']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the product pipeline against a fake API")
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--products", type=int, default=3, help="products per cycle")
+    parser.add_argument("--concurrency", type=int, default=0,
+                        help="use the concurrent cycle with this many requests in flight")
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--structured", action="store_true")
+    parser.add_argument("--latency", default="lognormal:0.8,0.4",
+                        help='fake time to first token, e.g. "0.5", "uniform:0.2,1", "lognormal:0.8,0.4"')
+    parser.add_argument("--tokens-per-second", type=float, default=400.0,
+                        help="fake output token rate (0 = instant)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--overload-rate", type=float, default=0.0)
+    parser.add_argument("--payloads", metavar="JSON", help="canned replies per stage")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-images", action="store_true", help="skip the image agents")
+    parser.add_argument("--no-pdf", action="store_true", help="skip the PDF report")
+    parser.add_argument("--render-workers", type=int, default=0,
+                        help="render each cycle's images on this many worker processes")
+    parser.add_argument("--workdir", help="where cycles write their outputs (default: a temp dir)")
+    parser.add_argument("--record", metavar="CASSETTE", help="save the LLM replies of this run")
+    parser.add_argument("--replay", metavar="CASSETTE",
+                        help="serve LLM replies from a cassette to benchmark PDF/image stages reproducibly")
+    parser.add_argument("--output", metavar="JSON", help="also write the summary here")
+    parser.add_argument("--verbose", action="store_true", help="show the agents' own output")
+    args = parser.parse_args()
+
+    server = FakeAnthropicServer(latency=args.latency,
+                                 tokens_per_second=args.tokens_per_second or None,
+                                 rate_limit_rate=args.rate_limit_rate,
+                                 overload_rate=args.overload_rate,
+                                 payloads=load_payloads(args.payloads) if args.payloads else None,
+                                 seed=args.seed)
+
+    cassette = None
+    if args.replay:
+        cassette = Cassette(args.replay, "replay")
+    elif args.record:
+        cassette = Cassette(args.record, "record")
+
+    print("🧪 Digital Product Pipeline Benchmark")
+    print("=" * 40)
+    with server:
+        benchmark = PipelineBenchmark(server, args.cycles, args.products, args.concurrency,
+                                      args.stream, args.structured, images=not args.no_images,
+                                      pdf=not args.no_pdf,
+                                      workdir=os.path.abspath(args.workdir) if args.workdir else None,
+                                      verbose=args.verbose, cassette=cassette,
+                                      render_workers=args.render_workers)
+        summary = benchmark.run()
+
+    print_summary(summary)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"💾 Summary saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
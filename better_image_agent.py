@@ -1,15 +1,73 @@
 # Professional Etsy Image Creation Agent - FIXED VERSION
 # Save as: better_image_agent.py
 
+import argparse
 import requests
 import json
-from PIL import Image, ImageDraw, ImageFont
+from functools import lru_cache
+import numpy as np
+from PIL import Image, ImageDraw
 import textwrap
 import os
 
+from fonts import get_font
+from image_layers import layer_key, shared_layers
+from product_store import ProductStore, add_product_arguments, selected_products
+
+
+GRADIENT_DIRECTIONS = ("vertical", "horizontal", "diagonal", "radial")
+
+
+@lru_cache(maxsize=32)
+def gradient_image(size, stops, direction="vertical"):
+    """RGB gradient built in one NumPy step and memoized per (size, stops, direction).
+
+    `stops` is a tuple of colors spread evenly from start to end, or of
+    (position, color) pairs with positions from 0 to 1. Callers paste the
+    result into their own image; the cached one must not be drawn on.
+    """
+    if direction not in GRADIENT_DIRECTIONS:
+        raise ValueError(f"Unknown gradient direction {direction!r}, use one of {GRADIENT_DIRECTIONS}")
+    width, height = size
+    if len(stops[0]) == 2:
+        positions = [float(position) for position, _ in stops]
+        colors = np.array([color for _, color in stops], dtype=np.float64)
+    else:
+        positions = np.linspace(0.0, 1.0, len(stops))
+        colors = np.array(stops, dtype=np.float64)
+
+    # Position along the gradient, 0 at the start and 1 at the end; straight
+    # gradients only need one row or column, broadcast to the full size below
+    y = np.arange(height)[:, None] / height
+    x = np.arange(width)[None, :] / width
+    if direction == "vertical":
+        ratio = y
+    elif direction == "horizontal":
+        ratio = x
+    elif direction == "diagonal":
+        ratio = (x + y) / 2
+    else:
+        ratio = np.hypot(x - 0.5, (y - 0.5) * height / width) / np.hypot(0.5, 0.5 * height / width)
+
+    channels = [np.interp(ratio, positions, colors[:, channel]) for channel in range(3)]
+    pixels = np.broadcast_to(np.stack(channels, axis=-1), (height, width, 3)).astype(np.uint8)
+    return Image.fromarray(pixels, "RGB")
+
 
 class ProfessionalEtsyAgent:
-    def __init__(self):
+    # (image name, create method) for every template, in upload order
+    TEMPLATES = (
+        ("1_main", "create_main_image"),
+        ("2_whats_included", "create_whats_included_image"),
+        ("3_preview", "create_preview_image"),
+        ("4_benefits", "create_benefits_image"),
+        ("5_instant_download", "create_instant_download_image")
+    )
+    SAVE_PARAMS = {"quality": 95}
+
+    def __init__(self, layers=None):
+        # Static template layers, drawn once per process (image_layers.LayerCache)
+        self.layers = layers or shared_layers()
         self.image_size = (1000, 1000)
         # Modern color palette
         self.bg_color = (245, 247, 250)  # Light gray
@@ -17,43 +75,36 @@ class ProfessionalEtsyAgent:
         self.accent = (59, 130, 246)  # Blue
         self.green = (16, 185, 129)  # Green
         self.orange = (251, 146, 60)  # Orange
+        self.price_badge_size = (200, 70)
 
     def get_font(self, size):
-        """Get font with fallbacks"""
-        font_options = [
-            "arial.ttf", "Arial.ttf",
-            "/System/Library/Fonts/Arial.ttf",
-            "/Windows/Fonts/arial.ttf",
-            "DejaVuSans.ttf"
-        ]
+        """Get font with fallbacks (resolved once, then cached per size; see fonts.py)"""
+        return get_font(size)
 
-        for font_path in font_options:
-            try:
-                return ImageFont.truetype(font_path, size)
-            except:
-                continue
+    def add_gradient_bg(self, img, stops=None, direction="vertical"):
+        """Add subtle gradient background"""
+        # Light gray to 30% of the way to white, unless other stops are given
+        stops = stops or (self.bg_color, tuple(c + (255 - c) * 0.3 for c in self.bg_color))
+        img.paste(gradient_image(img.size, tuple(stops), direction))
+        return img
 
-        # Fallback to default but bigger
-        return ImageFont.load_default()
+    def static_layer(self, template, draw_layer):
+        """Copy of a template's static layer, drawn by draw_layer() on first use"""
+        return self.layers.get(layer_key(self, template, "sans"), draw_layer)
 
-    def add_gradient_bg(self, img):
-        """Add subtle gradient background"""
+    def create_main_image(self, product_data):
+        """Create eye-catching main image"""
+        img = self.static_layer("main", self.draw_main_layer)
         draw = ImageDraw.Draw(img)
-        width, height = img.size
-
-        for y in range(height):
-            # Create subtle gradient from light to lighter
-            ratio = y / height
-            r = int(245 + (255 - 245) * ratio * 0.3)
-            g = int(247 + (255 - 247) * ratio * 0.3)
-            b = int(250 + (255 - 250) * ratio * 0.3)
 
-            draw.line([(0, y), (width, y)], fill=(r, g, b))
+        # Only the price changes from product to product
+        price = f"${product_data['opportunity']['price']}"
+        self.draw_price_text(draw, price, 150, 750)
 
         return img
 
-    def create_main_image(self, product_data):
-        """Create eye-catching main image"""
+    def draw_main_layer(self):
+        """Main image without the price"""
         img = Image.new('RGB', self.image_size, self.bg_color)
         img = self.add_gradient_bg(img)
         draw = ImageDraw.Draw(img)
@@ -90,9 +141,8 @@ class ProfessionalEtsyAgent:
         x = (self.image_size[0] - text_width) // 2
         draw.text((x, y_start + 40), subtitle, fill=self.primary, font=subtitle_font)
 
-        # Price with badge effect
-        price = f"${product_data['opportunity']['price']}"
-        self.draw_price_badge(draw, price, 150, 750)
+        # Price badge, filled in per product
+        self.draw_price_badge(draw, None, 150, 750)
 
         # Add "INSTANT DOWNLOAD" badge
         self.draw_instant_badge(draw, 600, 750)
@@ -100,13 +150,18 @@ class ProfessionalEtsyAgent:
         return img
 
     def draw_price_badge(self, draw, price, x, y):
-        """Draw attractive price badge"""
+        """Draw attractive price badge (only the badge when price is None)"""
         # Badge background
-        badge_width, badge_height = 200, 70
+        badge_width, badge_height = self.price_badge_size
         draw.rounded_rectangle([x, y, x + badge_width, y + badge_height],
                                radius=35, fill=self.green)
 
-        # Price text
+        if price is not None:
+            self.draw_price_text(draw, price, x, y)
+
+    def draw_price_text(self, draw, price, x, y):
+        """Price text centered in the badge at (x, y)"""
+        badge_width, _ = self.price_badge_size
         font = self.get_font(40)
         bbox = draw.textbbox((0, 0), price, font=font)
         text_width = bbox[2] - bbox[0]
@@ -144,6 +199,11 @@ class ProfessionalEtsyAgent:
 
     def create_whats_included_image(self, product_data):
         """Create attractive what's included image"""
+        # Nothing on it depends on the product
+        return self.static_layer("whats_included", self.draw_whats_included_layer)
+
+    def draw_whats_included_layer(self):
+        """Static whats included image"""
         img = Image.new('RGB', self.image_size, self.bg_color)
         img = self.add_gradient_bg(img)
         draw = ImageDraw.Draw(img)
@@ -186,6 +246,11 @@ class ProfessionalEtsyAgent:
 
     def create_benefits_image(self, product_data):
         """Create benefits image with icons"""
+        # Nothing on it depends on the product
+        return self.static_layer("benefits", self.draw_benefits_layer)
+
+    def draw_benefits_layer(self):
+        """Static benefits image"""
         img = Image.new('RGB', self.image_size, self.bg_color)
         img = self.add_gradient_bg(img)
         draw = ImageDraw.Draw(img)
@@ -225,6 +290,11 @@ class ProfessionalEtsyAgent:
 
     def create_preview_image(self, product_data):
         """Create content preview"""
+        # Nothing on it depends on the product
+        return self.static_layer("preview", self.draw_preview_layer)
+
+    def draw_preview_layer(self):
+        """Static preview image"""
         img = Image.new('RGB', self.image_size, self.bg_color)
         img = self.add_gradient_bg(img)
         draw = ImageDraw.Draw(img)
@@ -270,6 +340,11 @@ class ProfessionalEtsyAgent:
 
     def create_instant_download_image(self, product_data):
         """Create download info image"""
+        # Nothing on it depends on the product
+        return self.static_layer("instant_download", self.draw_instant_download_layer)
+
+    def draw_instant_download_layer(self):
+        """Static instant download image"""
         img = Image.new('RGB', self.image_size, self.bg_color)
         img = self.add_gradient_bg(img)
         draw = ImageDraw.Draw(img)
@@ -309,23 +384,20 @@ class ProfessionalEtsyAgent:
 
         return img
 
+    def image_path(self, output_dir, name):
+        return f"{output_dir}/{name}.png"
+
     def generate_all_images(self, product_data, output_dir="professional_etsy_images"):
         """Generate all professional images"""
         os.makedirs(output_dir, exist_ok=True)
 
         print("🎨 Creating professional Etsy images...")
 
-        images = {
-            "1_main": self.create_main_image(product_data),
-            "2_whats_included": self.create_whats_included_image(product_data),
-            "3_preview": self.create_preview_image(product_data),
-            "4_benefits": self.create_benefits_image(product_data),
-            "5_instant_download": self.create_instant_download_image(product_data)
-        }
+        images = {name: getattr(self, method)(product_data) for name, method in self.TEMPLATES}
 
         for name, img in images.items():
-            filename = f"{output_dir}/{name}.png"
-            img.save(filename, quality=95)
+            filename = self.image_path(output_dir, name)
+            img.save(filename, **self.SAVE_PARAMS)
             print(f"✅ Created: {filename}")
 
         print(f"\n🎉 Professional images ready in '{output_dir}' folder!")
@@ -336,12 +408,26 @@ class ProfessionalEtsyAgent:
 
 # Usage
 def main():
-    with open('digital_products_20250629_102651.json', 'r') as f:
-        data = json.load(f)
-
-    product_data = data['products'][0]
-    agent = ProfessionalEtsyAgent()
-    agent.generate_all_images(product_data)
+    parser = argparse.ArgumentParser(description="ProfessionalEtsyAgent: images for products in the store")
+    add_product_arguments(parser)
+    parser.add_argument("--output-dir", default="professional_etsy_images")
+    parser.add_argument("--layer-cache", metavar="DIR",
+                        help="also keep the static template layers as PNGs here, for later runs")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="render templates on this many worker processes (default: one by one)")
+    args = parser.parse_args()
+
+    store = None if args.from_json else ProductStore(args.db)
+
+    # Imported here: parallel_render imports this module for its worker processes
+    from parallel_render import render_products
+
+    # Products stream in one at a time, each into its own folder
+    render_products("professional_image", selected_products(args, store), args.output_dir,
+                    workers=args.workers, store=store, layer_cache=args.layer_cache)
+
+    if store is not None:
+        store.close()
 
 
 if __name__ == "__main__":
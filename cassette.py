@@ -0,0 +1,83 @@
+# Record/Replay Cassettes for LLM Calls
+# Save as: cassette.py
+
+import gzip
+import json
+import os
+import threading
+
+
+class CassetteMiss(Exception):
+    """A replayed run asked for a request that was never recorded"""
+
+
+class Cassette:
+    """Every Messages API reply of a run, keyed by request hash, in one gzipped JSONL file.
+
+    In "record" mode replies are collected as they come back and written on
+    save(). In "replay" mode they are served back in recorded order with no
+    network and no latency. A request asked for more often than it was
+    recorded gets its last reply again.
+    """
+
+    def __init__(self, path, mode="replay"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.lock = threading.Lock()
+        self.entries = []  # (stage, key, response) in call order
+        self.replies = {}  # key -> list of responses still to play
+        self.last = {}  # key -> last response played
+        self.played = 0
+
+        if mode == "replay":
+            self._load()
+
+    @property
+    def replaying(self):
+        return self.mode == "replay"
+
+    def _load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.replies.setdefault(entry["key"], []).append(entry["response"])
+                    self.entries.append((entry["stage"], entry["key"], entry["response"]))
+        print(f"📼 Replaying {len(self.entries)} recorded replies from {self.path}")
+
+    def record(self, stage, key, response):
+        """Remember one reply (a Message dict) for `key`"""
+        with self.lock:
+            self.entries.append((stage, key, response))
+
+    def play(self, stage, key):
+        """The next recorded reply dict for `key`; raises CassetteMiss if there is none"""
+        with self.lock:
+            queue = self.replies.get(key)
+            if queue:
+                self.last[key] = queue.pop(0)
+            elif key not in self.last:
+                raise CassetteMiss(f"No recorded {stage} reply for request {key[:12]} in {self.path}")
+            self.played += 1
+            return self.last[key]
+
+    def save(self):
+        """Write the recorded replies (record mode only)"""
+        if self.replaying:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with gzip.open(temp_path, "wt", encoding="utf-8", compresslevel=9) as f:
+            for stage, key, response in self.entries:
+                f.write(json.dumps({"stage": stage, "key": key, "response": response},
+                                   separators=(",", ":")) + "\n")
+        os.replace(temp_path, self.path)
+        print(f"📼 Recorded {len(self.entries)} replies to {self.path} "
+              f"({os.path.getsize(self.path) / 1024:.1f} KB)")
+
+    def stats(self):
+        return {"mode": self.mode, "entries": len(self.entries), "played": self.played}
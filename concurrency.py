@@ -0,0 +1,163 @@
+# Adaptive Concurrency (AIMD) for outbound API calls
+# Save as: concurrency.py
+
+import asyncio
+import threading
+import time
+from collections import deque
+
+
+class AIMDController:
+    """Async semaphore whose size follows the API's health, TCP-style.
+
+    Use it like asyncio.Semaphore (`async with controller:`). Every reply
+    reports its latency through observe() and every 429/529 through
+    overloaded(). While latency and the error rate stay healthy the window
+    grows by `increase` per window's worth of replies (additive increase);
+    a 429/529 or a latency spike multiplies it by `decrease` (multiplicative
+    decrease), at most once per typical call latency so one burst of errors
+    from calls already in flight only counts once.
+
+    A reply is a latency spike when it is slower than `latency_slo` seconds,
+    or, without an SLO, slower than `spike_factor` times the median of its
+    stage's recent replies.
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=32, increase=1.0, decrease=0.5,
+                 latency_slo=None, spike_factor=2.5, max_error_rate=0.1, window=20,
+                 min_samples=5, metrics=None):
+        self.lock = threading.Lock()
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_slo = latency_slo
+        self.spike_factor = spike_factor
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.latencies = {}  # stage -> recent reply latencies
+        self.outcomes = deque(maxlen=window)  # recent True (reply) / False (429/529)
+        self.last_decrease = 0.0
+        self.in_flight = 0
+        self.admitted = 0  # jobs (e.g. opportunities) started through admit()
+        self.peak = self.limit
+        self.increases = 0
+        self.decreases = 0
+        self.window_size = window
+        self.metrics = metrics
+        self.condition = None
+        self.loop = None
+        self._publish()
+
+    @property
+    def window(self):
+        """Calls allowed in flight right now"""
+        return max(self.minimum, int(self.limit))
+
+    # Semaphore side
+    def _condition(self):
+        # Cycles may each run in their own event loop (asyncio.run per cycle)
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.loop = loop
+            self.condition = asyncio.Condition()
+        return self.condition
+
+    async def acquire(self):
+        condition = self._condition()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < self.window)
+            self.in_flight += 1
+
+    async def release(self):
+        condition = self._condition()
+        async with condition:
+            self.in_flight -= 1
+            condition.notify_all()
+
+    async def admit(self):
+        """Wait until fewer jobs are open than the window allows, then open one"""
+        condition = self._condition()
+        async with condition:
+            await condition.wait_for(lambda: self.admitted < self.window)
+            self.admitted += 1
+
+    async def dismiss(self):
+        """Close a job opened with admit()"""
+        condition = self._condition()
+        async with condition:
+            self.admitted -= 1
+            condition.notify_all()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.release()
+
+    # Feedback side (safe to call from any thread)
+    def observe(self, stage, latency):
+        """One successful reply and how long it took"""
+        with self.lock:
+            recent = self.latencies.setdefault(stage, deque(maxlen=self.window_size))
+            spike = self._is_spike(recent, latency)
+            recent.append(latency)
+            self.outcomes.append(True)
+            if spike:
+                self._decrease(f"{stage} latency spike ({latency:.1f}s)")
+            elif self._error_rate() <= self.max_error_rate and self.limit < self.maximum:
+                self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+                self.increases += 1
+            self.peak = max(self.peak, self.limit)
+        self._publish()
+
+    def overloaded(self, status):
+        """A 429/529 came back"""
+        with self.lock:
+            self.outcomes.append(False)
+            self._decrease(f"API returned {status}")
+        self._publish()
+
+    def _is_spike(self, recent, latency):
+        if self.latency_slo is not None:
+            return latency > self.latency_slo
+        if len(recent) < self.min_samples:
+            return False
+        return latency > self.spike_factor * sorted(recent)[len(recent) // 2]
+
+    def _error_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for ok in self.outcomes if not ok) / len(self.outcomes)
+
+    def _typical_latency(self):
+        samples = sorted(latency for recent in self.latencies.values() for latency in recent)
+        return samples[len(samples) // 2] if samples else 1.0
+
+    def _decrease(self, reason):
+        now = time.monotonic()
+        if now - self.last_decrease < self._typical_latency():
+            return
+        self.last_decrease = now
+        before = self.window
+        self.limit = max(float(self.minimum), self.limit * self.decrease)
+        self.decreases += 1
+        print(f"🐢 {reason}: concurrency {before} → {self.window}")
+
+    def _publish(self):
+        if self.metrics is not None:
+            self.metrics.set_gauge("llm_concurrency_window", self.window,
+                                   "Calls the adaptive concurrency controller allows in flight")
+
+    def stats(self):
+        with self.lock:
+            return {
+                "window": self.window,
+                "peak_window": int(self.peak),
+                "in_flight": self.in_flight,
+                "increases": self.increases,
+                "decreases": self.decreases,
+                "error_rate": round(self._error_rate(), 3)
+            }
@@ -307,7 +307,18 @@ class ModernBusinessReport(FPDF):
             for j, cell in enumerate(row):
                 cell_str = str(cell)
                 # Highlight monetary values
-                if '
+                if '$' in cell_str or '%' in cell_str:
+                    self.set_font('Helvetica', 'B', 9)
+                    self.set_color_rgb('accent_yellow')
+                else:
+                    self.set_font('Helvetica', '', 9)
+                    self.set_color_rgb('text_primary')
+
+                align = 'R' if ('$' in cell_str or '%' in cell_str) else 'L'
+                self.cell(col_width, row_height, cell_str, 1, new_x=XPos.RIGHT, new_y=YPos.TOP, align=align, fill=True)
+            self.ln()
+
+        self.ln(8)
 
 
 def create_sample_report():
@@ -579,107 +590,6 @@ def create_custom_document_example():
     return filename
 
 
-if __name__ == "__main__":
-    main() in cell_str or '%' in cell_str:
-    self.set_font('Helvetica', 'B', 9)
-    self.set_color_rgb('accent_yellow')
-else:
-    self.set_font('Helvetica', '', 9)
-    self.set_color_rgb('text_primary')
-
-align = 'R' if ('
-
-
-def create_sample_report():
-    """Create a sample modern business report"""
-    pdf = ModernBusinessReport()
-
-    # Cover page
-    pdf.create_cover_page()
-
-    # Chapter 1
-    pdf.create_chapter(1, "Market Analysis & Strategic Positioning",
-                       "Data-driven insights for competitive advantage and sustainable growth")
-
-    # Executive Overview
-    pdf.create_section("Executive Overview")
-    pdf.add_body_text([
-        "The current market environment presents unprecedented opportunities for",
-        "strategic positioning and accelerated growth through systematic implementation",
-        "of proven business optimization frameworks."
-    ], "lead")
-
-    # Callout box
-    pdf.create_info_box(
-        "Strategic Insight",
-        ["Organizations implementing our comprehensive framework achieve 3.5x faster",
-         "growth rates compared to industry benchmarks, with sustained performance",
-         "improvements maintained over 24+ month periods."]
-    )
-
-    # Performance Metrics
-    pdf.create_section("Performance Metrics")
-    pdf.add_body_text([
-        "Our analysis reveals critical performance indicators that directly correlate",
-        "with sustainable business success and market leadership positioning."
-    ])
-
-    # Create table
-    headers = ["Performance Metric", "Current State", "Target Outcome", "Improvement"]
-    data = [
-        ["Revenue Growth", "$2.4M annually", "$7.8M annually", "+225%"],
-        ["Market Share", "12% regional", "34% regional", "+183%"],
-        ["Customer Retention", "78% annually", "96% annually", "+23%"],
-        ["Operational Efficiency", "67% capacity", "94% capacity", "+40%"]
-    ]
-
-    pdf.create_modern_table(headers, data)
-
-    # Implementation Roadmap
-    pdf.create_section("Implementation Roadmap")
-    pdf.add_body_text([
-        "Our systematic approach ensures measurable progress through clearly defined",
-        "phases, each building upon previous achievements while maintaining operational",
-        "stability and continuous performance optimization."
-    ])
-
-    # Roadmap table
-    roadmap_headers = ["Phase", "Duration", "Key Deliverables", "Success Metrics"]
-    roadmap_data = [
-        ["Discovery", "2-3 weeks", "Comprehensive audit", "Baseline established"],
-        ["Strategy Development", "3-4 weeks", "Strategic plan", "Plan approved"],
-        ["Implementation", "8-12 weeks", "System deployment", "Metrics improved"],
-        ["Optimization", "Ongoing", "Performance tuning", "Targets achieved"]
-    ]
-
-    pdf.create_modern_table(roadmap_headers, roadmap_data)
-
-    # Final recommendation
-    pdf.create_info_box(
-        "Strategic Recommendation",
-        ["Successful strategic transformation requires both visionary leadership and",
-         "systematic execution. Our framework provides the structure, methodologies,",
-         "and tools necessary to achieve sustainable competitive advantage in today's",
-         "dynamic business environment."],
-        "dark"
-    )
-
-    # Save the PDF
-    filename = "modern_business_report.pdf"
-    pdf.output(filename)
-
-    print(f"✅ Modern business report created: {filename}")
-    print("\n🎯 Features included:")
-    print("   • Modern typography and color scheme")
-    print("   • Geometric design elements")
-    print("   • Professional tables with highlighting")
-    print("   • Strategic info boxes")
-    print("   • Executive-level content presentation")
-    print("   • Clean, contemporary layout")
-
-    return filename
-
-
 def main():
     """Create the sample report and demonstrate custom content creation"""
     print("🚀 Creating modern business report...")
@@ -713,119 +623,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
-if __name__ == "__main__":
-    main() in cell_str or '%' in cell_str) else 'L'
-    self.cell(col_width, row_height, cell_str, 1, new_x=XPos.RIGHT, new_y=YPos.TOP, align=align, fill=True)
-    self.ln()
-
-    self.ln(8)
-
-
-def create_sample_report():
-    """Create a sample modern business report"""
-    pdf = ModernBusinessReport()
-
-    # Cover page
-    pdf.create_cover_page()
-
-    # Chapter 1
-    pdf.create_chapter(1, "Market Analysis & Strategic Positioning",
-                       "Data-driven insights for competitive advantage and sustainable growth")
-
-    # Executive Overview
-    pdf.create_section("Executive Overview")
-    pdf.add_body_text([
-        "The current market environment presents unprecedented opportunities for",
-        "strategic positioning and accelerated growth through systematic implementation",
-        "of proven business optimization frameworks."
-    ], "lead")
-
-    # Callout box
-    pdf.create_info_box(
-        "Strategic Insight",
-        ["Organizations implementing our comprehensive framework achieve 3.5x faster",
-         "growth rates compared to industry benchmarks, with sustained performance",
-         "improvements maintained over 24+ month periods."]
-    )
-
-    # Performance Metrics
-    pdf.create_section("Performance Metrics")
-    pdf.add_body_text([
-        "Our analysis reveals critical performance indicators that directly correlate",
-        "with sustainable business success and market leadership positioning."
-    ])
-
-    # Create table
-    headers = ["Performance Metric", "Current State", "Target Outcome", "Improvement"]
-    data = [
-        ["Revenue Growth", "$2.4M annually", "$7.8M annually", "+225%"],
-        ["Market Share", "12% regional", "34% regional", "+183%"],
-        ["Customer Retention", "78% annually", "96% annually", "+23%"],
-        ["Operational Efficiency", "67% capacity", "94% capacity", "+40%"]
-    ]
-
-    pdf.create_modern_table(headers, data)
-
-    # Implementation Roadmap
-    pdf.create_section("Implementation Roadmap")
-    pdf.add_body_text([
-        "Our systematic approach ensures measurable progress through clearly defined",
-        "phases, each building upon previous achievements while maintaining operational",
-        "stability and continuous performance optimization."
-    ])
-
-    # Roadmap table
-    roadmap_headers = ["Phase", "Duration", "Key Deliverables", "Success Metrics"]
-    roadmap_data = [
-        ["Discovery", "2-3 weeks", "Comprehensive audit", "Baseline established"],
-        ["Strategy Development", "3-4 weeks", "Strategic plan", "Plan approved"],
-        ["Implementation", "8-12 weeks", "System deployment", "Metrics improved"],
-        ["Optimization", "Ongoing", "Performance tuning", "Targets achieved"]
-    ]
-
-    pdf.create_modern_table(roadmap_headers, roadmap_data)
-
-    # Final recommendation
-    pdf.create_info_box(
-        "Strategic Recommendation",
-        ["Successful strategic transformation requires both visionary leadership and",
-         "systematic execution. Our framework provides the structure, methodologies,",
-         "and tools necessary to achieve sustainable competitive advantage in today's",
-         "dynamic business environment."],
-        "dark"
-    )
-
-    # Save the PDF
-    filename = "modern_business_report.pdf"
-    pdf.output(filename)
-
-    print(f"✅ Modern business report created: {filename}")
-    print("\n🎯 Features included:")
-    print("   • Modern typography and color scheme")
-    print("   • Geometric design elements")
-    print("   • Professional tables with highlighting")
-    print("   • Strategic info boxes")
-    print("   • Executive-level content presentation")
-    print("   • Clean, contemporary layout")
-
-    return filename
-
-
-def main():
-    """Create the sample report"""
-    print("🚀 Creating modern business report...")
-    print("📦 Using FPDF (lightweight, no complex dependencies)")
-
-    filename = create_sample_report()
-
-    print(f"\n📄 Report generated: {filename}")
-    print("\n💡 This approach:")
-    print("   • Works on all systems (no complex dependencies)")
-    print("   • Creates professional-looking PDFs")
-    print("   • Easy to customize and extend")
-    print("   • Fast and reliable")
-
-
-if __name__ == "__main__":
-    main()
\ No newline at end of file
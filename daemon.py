@@ -0,0 +1,333 @@
+# Headless Product Agent Daemon
+# Save as: daemon.py
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import signal
+import time
+import uuid
+from datetime import datetime
+
+from concurrency import AIMDController
+from digital_agent import SimpleProductAgent, load_niches
+from http_pool import configure_pool
+from journal import CycleJournal
+from llm_cache import ResponseCache
+from model_router import ModelRouter, load_routes
+from product_store import ProductStore
+from rate_limiter import RateLimiter
+from work_queue import Budget
+
+DEFAULT_CONFIG = {
+    "base_url": None,
+    "db": "products.db",
+    "cache_dir": None,
+    "structured": False,
+    "routes": None,  # "single", "tiered" or a routes JSON file
+    "niches": None,  # file or comma-separated list
+    "ideas_per_niche": 10,
+    "concurrency": 4,
+    "adaptive_concurrency": None,  # max window; adapts (AIMD) from "concurrency" when set
+    "stream": False,
+    "max_products": 5,
+    "max_tokens": None,
+    "max_minutes": None,
+    "schedule_minutes": 0,  # 0 = only run enqueued jobs
+    "run_on_start": False,
+    "jobs_dir": "jobs",
+    "state_dir": "daemon_state",
+    "output_dir": "daemon_output",
+    "render": True,
+    "render_workers": 0,  # >0: render images on a process pool of this size
+    "poll_seconds": 5,
+    "requests_per_minute": 50,
+    "tokens_per_minute": 40000,
+    "max_connections": 100,
+    "http2": True
+}
+
+# Settings a single job may override
+JOB_KEYS = ("niches", "ideas_per_niche", "concurrency", "stream", "max_products",
+            "max_tokens", "max_minutes", "render")
+
+# Files a cycle leaves next to its job file
+JOB_FILES = (".journal.jsonl", ".metrics.prom", ".metrics.json")
+
+ENV_PREFIX = "PRODUCT_AGENT_"
+
+
+def load_config(path=None):
+    """Defaults, then a JSON config file, then PRODUCT_AGENT_<KEY> environment variables"""
+    config = dict(DEFAULT_CONFIG)
+    path = path or os.environ.get(ENV_PREFIX + "CONFIG")
+    if path:
+        with open(path, 'r') as f:
+            config.update(json.load(f))
+
+    for key in DEFAULT_CONFIG:
+        value = os.environ.get(ENV_PREFIX + key.upper())
+        if value is None:
+            continue
+        try:
+            config[key] = json.loads(value)
+        except ValueError:
+            config[key] = value  # plain strings such as URLs and niche lists
+    return config
+
+
+def enqueue_job(jobs_dir, job):
+    """Drop a job file where the daemon will pick it up; returns its path"""
+    os.makedirs(jobs_dir, exist_ok=True)
+    name = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.json"
+    path = os.path.join(jobs_dir, name)
+    # Written under another name first so the daemon never reads half a job
+    with open(path + ".tmp", 'w') as f:
+        json.dump(job, f, indent=2)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+class ProductDaemon:
+    """Long-running, non-interactive product creation service.
+
+    One agent (pooled HTTP clients, response cache, product store) and one
+    renderer (image agents) are built at start-up and reused by every cycle.
+    Cycles come from job files dropped in `jobs_dir` and, optionally, from a
+    fixed schedule. Each cycle's job and journal live in `state_dir` until it
+    completes, so a killed daemon resumes them on its next start.
+
+    SIGTERM/SIGINT drain: no new products are claimed, in-flight ones finish
+    and are saved. A second signal stops immediately (the journal keeps the
+    finished work for the next start).
+    """
+
+    def __init__(self, config, api_key):
+        self.config = config
+        self.stopping = False
+        self.wake = None
+        self.current_task = None
+        self.current_budget = None
+        self.completed = 0
+
+        for name in ("jobs_dir", "state_dir", "output_dir"):
+            os.makedirs(config[name], exist_ok=True)
+        os.makedirs(os.path.join(config["state_dir"], "done"), exist_ok=True)
+        os.makedirs(os.path.join(config["state_dir"], "failed"), exist_ok=True)
+
+        configure_pool(max_connections=config["max_connections"],
+                       max_keepalive_connections=min(20, config["max_connections"]),
+                       http2=config["http2"])
+        self.store = ProductStore(config["db"])
+        self.agent = SimpleProductAgent(
+            api_key,
+            rate_limiter=RateLimiter(config["requests_per_minute"], config["tokens_per_minute"]),
+            cache=ResponseCache(config["cache_dir"]) if config["cache_dir"] else None,
+            base_url=config["base_url"],
+            structured_output=config["structured"],
+            store=self.store,
+            router=ModelRouter(load_routes(config["routes"])))
+
+        # One AIMD window for the daemon's lifetime, so each cycle starts from what the last learned
+        self.concurrency = None
+        if config["adaptive_concurrency"]:
+            self.concurrency = AIMDController(config["concurrency"],
+                                              maximum=config["adaptive_concurrency"],
+                                              metrics=self.agent.metrics)
+
+        self.renderer = None
+        if config["render"]:
+            from parallel_render import ImageRenderPool
+            from render_pipeline import ProductRenderer
+            image_pool = ImageRenderPool(config["render_workers"]) if config["render_workers"] else None
+            self.renderer = ProductRenderer(self.store, image_pool=image_pool)
+
+    # Signals
+    def request_stop(self):
+        if self.stopping:
+            print("🛑 Second stop signal: stopping now (finished work is in the journal)")
+            if self.current_task is not None:
+                self.current_task.cancel()
+            return
+
+        print("🛑 Stop requested: finishing in-flight products, claiming no new ones...")
+        self.stopping = True
+        if self.current_budget is not None:
+            self.current_budget.stop()
+        self.wake.set()
+
+    # Jobs
+    def claim_job(self):
+        """Move the oldest queued job into the state dir; returns its new path or None"""
+        for path in sorted(glob.glob(os.path.join(self.config["jobs_dir"], "*.json"))):
+            name = os.path.basename(path)[:-len(".json")]
+            claimed = os.path.join(self.config["state_dir"], f"cycle_{name}.job.json")
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue  # another daemon got it first
+            return claimed
+        return None
+
+    def schedule_job(self):
+        """Queue and claim a job with the configured defaults for a scheduled cycle"""
+        enqueue_job(self.config["jobs_dir"], {"scheduled": True})
+        return self.claim_job()
+
+    def unfinished_jobs(self):
+        """Jobs a previous run claimed but never completed"""
+        return sorted(glob.glob(os.path.join(self.config["state_dir"], "*.job.json")))
+
+    def job_settings(self, job):
+        settings = {key: self.config[key] for key in JOB_KEYS}
+        settings.update({key: job[key] for key in JOB_KEYS if key in job})
+        return settings
+
+    def finish_job(self, job_path, outcome):
+        """Move a job with its journal and metrics files to done/ or failed/"""
+        folder = os.path.join(self.config["state_dir"], outcome)
+        base = job_path[:-len(".job.json")]
+        for path in [job_path] + [base + suffix for suffix in JOB_FILES]:
+            if os.path.exists(path):
+                os.replace(path, os.path.join(folder, os.path.basename(path)))
+
+    async def run_job(self, job_path):
+        with open(job_path, 'r') as f:
+            job = json.load(f)
+        if "started_at" not in job:
+            job["started_at"] = datetime.now().isoformat()
+            with open(job_path, 'w') as f:
+                json.dump(job, f, indent=2)
+
+        settings = self.job_settings(job)
+        journal_path = job_path[:-len(".job.json")] + ".journal.jsonl"
+        print(f"\n📬 Running job {os.path.basename(job_path)}: {settings}")
+
+        budget = Budget(settings["max_products"], settings["max_tokens"],
+                        settings["max_minutes"] * 60 if settings["max_minutes"] else None)
+        if self.stopping:
+            budget.stop()
+        self.current_budget = budget
+        self.agent.niches = load_niches(settings["niches"])
+        self.agent.ideas_per_niche = settings["ideas_per_niche"]
+
+        journal = CycleJournal(journal_path)
+        try:
+            await self.agent.run_full_cycle_async(settings["concurrency"], settings["stream"],
+                                                  journal, budget, adaptive=self.concurrency)
+        except Exception as e:
+            print(f"❌ Job {os.path.basename(job_path)} failed: {e}")
+            journal.close()
+            self.finish_job(job_path, "failed")
+            return
+        finally:
+            self.current_budget = None
+
+        journal.close()
+        if settings["render"] and self.renderer is not None:
+            # Products are already in the store; a render failure doesn't fail the job
+            try:
+                await asyncio.to_thread(self.render_new_products, job["started_at"])
+            except Exception as e:
+                print(f"⚠️ Rendering for job {os.path.basename(job_path)} failed: {e}")
+        if budget.stopped and not journal.created:
+            # Drained before any product was made; nothing is saved yet, so run it next start
+            print(f"📓 Job {os.path.basename(job_path)} left for the next start")
+            return
+        self.finish_job(job_path, "done")
+        self.completed += 1
+
+    def render_new_products(self, since):
+        """PDF and images for stored products from this job that have none yet"""
+        items = []
+        for product_id in self.store.find_products(since=since):
+            if self.store.artifacts(product_id):
+                continue
+            output_dir = os.path.join(self.config["output_dir"], f"product_{product_id}")
+            items.append((self.store.get_product(product_id), output_dir, product_id))
+        results = self.renderer.render_batch(items)
+        for (_, output_dir, product_id), outputs in zip(items, results):
+            if outputs is not None:
+                print(f"🎨 Rendered product {product_id}: {output_dir}")
+
+    async def run_current(self, job_path):
+        self.current_task = asyncio.create_task(self.run_job(job_path))
+        try:
+            await self.current_task
+        finally:
+            self.current_task = None
+
+    # Main loop
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        self.wake = asyncio.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self.request_stop)
+
+        interval = self.config["schedule_minutes"] * 60
+        next_run = time.monotonic() if self.config["run_on_start"] else time.monotonic() + interval
+        print(f"🟢 Daemon ready (jobs: {self.config['jobs_dir']}, "
+              f"schedule: {'every %s min' % self.config['schedule_minutes'] if interval else 'off'})")
+
+        try:
+            for job_path in self.unfinished_jobs():
+                if self.stopping:
+                    break
+                print(f"📓 Resuming unfinished job {os.path.basename(job_path)}")
+                await self.run_current(job_path)
+
+            while not self.stopping:
+                job_path = self.claim_job()
+                if job_path is None and interval and time.monotonic() >= next_run:
+                    job_path = self.schedule_job()
+                    next_run = time.monotonic() + interval
+                if job_path is not None:
+                    await self.run_current(job_path)
+                    continue
+
+                self.wake.clear()
+                try:
+                    await asyncio.wait_for(self.wake.wait(), self.config["poll_seconds"])
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await self.agent.http_pool.aclose_async()
+            if self.renderer is not None and self.renderer.image_pool is not None:
+                self.renderer.image_pool.close()
+            self.store.close()
+            print(f"👋 Daemon stopped after {self.completed} completed jobs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless Digital Product Agent daemon")
+    parser.add_argument("command", nargs="?", default="run", choices=("run", "enqueue"))
+    parser.add_argument("--config", help=f"JSON config file (or set {ENV_PREFIX}CONFIG)")
+    parser.add_argument("--niches", help="enqueue: niches for this job")
+    parser.add_argument("--max-products", type=int, help="enqueue: product budget for this job")
+    parser.add_argument("--concurrency", type=int, help="enqueue: concurrency for this job")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+
+    if args.command == "enqueue":
+        job = {key: value for key, value in (("niches", args.niches),
+                                             ("max_products", args.max_products),
+                                             ("concurrency", args.concurrency)) if value is not None}
+        print(f"📬 Enqueued {enqueue_job(config['jobs_dir'], job)}")
+        return
+
+    api_key = os.environ.get("ANTHROPIC_API_KEY", "").strip()
+    if not api_key:
+        print("❌ Set ANTHROPIC_API_KEY to run the daemon")
+        return
+
+    daemon = ProductDaemon(config, api_key)
+    asyncio.run(daemon.serve())
+
+
+if __name__ == "__main__":
+    main()
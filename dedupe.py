@@ -0,0 +1,108 @@
+# Near-Duplicate Detection for Opportunity Ideas
+# Save as: dedupe.py
+
+import re
+import zlib
+
+import numpy as np
+
+PRIME = (1 << 31) - 1  # hashes and coefficients stay below 2^31, so products fit in uint64
+
+
+def shingles(text, size=4):
+    """Character shingles of normalized text (lowercase, single spaces, no punctuation)"""
+    text = " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class NearDuplicateIndex:
+    """MinHash signatures with an LSH band index.
+
+    Adding an item only compares it against the few items that share an LSH
+    bucket with it, so the cost per item stays flat as the index grows.
+    """
+
+    def __init__(self, threshold=0.6, num_perm=120, bands=40, shingle_size=4, seed=1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, PRIME, size=num_perm, dtype=np.uint64)
+
+        self.signatures = {}
+        self.buckets = [{} for _ in range(bands)]
+
+    def signature(self, text):
+        """MinHash signature of a text, computed for all permutations at once"""
+        grams = shingles(text, self.shingle_size)
+        if not grams:
+            return np.full(self.num_perm, PRIME, dtype=np.uint64)
+        hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) & PRIME for g in grams),
+                             dtype=np.uint64, count=len(grams))
+        return ((np.outer(hashes, self.a) + self.b) % PRIME).min(axis=0)
+
+    def similarity(self, sig_a, sig_b):
+        """Estimated Jaccard similarity of two signatures"""
+        return float(np.mean(sig_a == sig_b))
+
+    def find(self, text, signature=None):
+        """Key of an indexed near-duplicate of `text`, or None"""
+        signature = self.signature(text) if signature is None else signature
+        checked = set()
+        for band, bucket in enumerate(self.buckets):
+            band_key = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for key in bucket.get(band_key, ()):
+                if key in checked:
+                    continue
+                checked.add(key)
+                if self.similarity(signature, self.signatures[key]) >= self.threshold:
+                    return key
+        return None
+
+    def add(self, key, text):
+        """Index `text` under `key` unless it duplicates something; returns the duplicate's key"""
+        signature = self.signature(text)
+        duplicate = self.find(text, signature)
+        if duplicate is not None:
+            return duplicate
+
+        self.signatures[key] = signature
+        for band, bucket in enumerate(self.buckets):
+            band_key = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            bucket.setdefault(band_key, []).append(key)
+        return None
+
+
+def dedupe_opportunities(opportunities, keyword_threshold=0.7, text_threshold=0.6):
+    """Drop opportunities whose keyword, or keyword + reasoning, nearly repeats an earlier one.
+
+    Returns (unique, duplicates) where duplicates pairs each dropped idea with the kept one.
+    """
+    keywords = NearDuplicateIndex(threshold=keyword_threshold, shingle_size=3)
+    texts = NearDuplicateIndex(threshold=text_threshold)
+    unique = []
+    duplicates = []
+
+    for opportunity in opportunities:
+        keyword = str(opportunity.get('keyword', ''))
+        text = f"{keyword} {opportunity.get('reasoning', '')}"
+        key = len(unique)
+
+        match = keywords.find(keyword)
+        if match is None:
+            match = texts.find(text)
+        if match is not None:
+            duplicates.append((opportunity, unique[match]))
+            continue
+
+        keywords.add(key, keyword)
+        texts.add(key, text)
+        unique.append(opportunity)
+
+    return unique, duplicates
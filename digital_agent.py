@@ -2,57 +2,533 @@
 # Save as: digital_agent.py
 
 import anthropic
+import argparse
+import asyncio
 import json
+import os
+import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from anthropic.types import Message
+
+from dedupe import dedupe_opportunities
+from http_pool import configure_pool, shared_pool
+from incremental_json import IncrementalJSONParser
+from journal import CycleJournal
+from cassette import Cassette
+from concurrency import AIMDController
+from llm_cache import ResponseCache, request_key
+from metrics import MetricsRecorder, cached_prefix_tokens, min_cacheable_tokens
+from model_router import ModelRouter, load_routes
+from product_store import ProductStore
+from rate_limiter import RateLimiter, estimate_tokens
+from singleflight import shared_coalescer
+from structured_output import (OPPORTUNITY_SCHEMA, SCHEMAS, invalid_fields, repair_prompt,
+                               repair_tool, tool_params, validate)
+from work_queue import Budget, OpportunityQueue
+
+MODEL = "claude-3-5-sonnet-20241022"
+RETRYABLE_STATUS = (429, 529)
+
+# Static instruction prefixes. They are identical on every call of a stage,
+# so they go in the system prompt behind a cache_control marker.
+OPPORTUNITY_INSTRUCTIONS = """
+You are a digital product opportunity scanner. You find HIGH-PROFIT digital product ideas.
+
+Consider:
+- New Year productivity trends
+- Business planning season
+- AI/automation interest
+- Side hustle demand
+
+Return ONLY valid JSON (no other text):
+[
+    {
+        "keyword": "specific trend",
+        "score": 85,
+        "opportunity": "high",
+        "price": 29.99,
+        "audience": "target buyer",
+        "reasoning": "why profitable"
+    }
+]
+"""
+
+PRODUCT_INSTRUCTIONS = """
+You create complete digital products for a given trend, target buyer and price.
+
+Create a valuable digital guide/ebook with:
+1. Catchy title
+2. Sales description
+3. Detailed outline (10+ sections)
+4. First chapter content (500+ words)
+5. Marketing keywords
+
+Return ONLY valid JSON:
+{
+    "title": "Product Title",
+    "description": "Sales copy description",
+    "outline": ["Section 1", "Section 2", "..."],
+    "sample_content": "First chapter content...",
+    "keywords": ["keyword1", "keyword2"],
+    "platforms": ["Etsy", "Gumroad"]
+}
+
+Make it genuinely valuable and worth its price.
+"""
+
+LISTINGS_INSTRUCTIONS = """
+You write optimized marketplace listings for digital products.
+
+Create listings for:
+1. Etsy (title + tags + description)
+2. Gumroad (title + description)
+
+Return ONLY valid JSON:
+{
+    "etsy": {
+        "title": "SEO optimized title (under 140 chars)",
+        "tags": ["tag1", "tag2", "tag3"],
+        "description": "Compelling Etsy description"
+    },
+    "gumroad": {
+        "title": "Gumroad title",
+        "description": "Gumroad sales description"
+    }
+}
+
+Optimize for sales conversion and platform algorithms.
+"""
+
+
+def cached_system(instructions):
+    """System prompt block marked for the server-side prompt cache"""
+    return [{"type": "text", "text": instructions, "cache_control": {"type": "ephemeral"}}]
+
 
 class SimpleProductAgent:
-    def __init__(self, api_key):
-        self.client = anthropic.Anthropic(api_key=api_key)
+    def __init__(self, api_key, rate_limiter=None, max_retries=3, cache=None, base_url=None,
+                 structured_output=False, niches=None, ideas_per_niche=10, discovery_workers=8,
+                 metrics=None, cassette=None, store=None, http_pool=None, coalescer=None,
+                 router=None):
+        # Clients come from a process-wide connection pool (http_pool.HttpClientPool) so
+        # agents created per job reuse warm connections. Their SDK retries are off:
+        # retries are handled here so every attempt goes through the rate limiter
+        self.api_key = api_key
+        self.base_url = base_url
+        self.http_pool = http_pool or shared_pool()
+        self.client = self.http_pool.anthropic(api_key, base_url)
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.max_retries = max_retries
+        # Opt-in on-disk response cache (llm_cache.ResponseCache)
+        self.cache = cache
+        # Force schema-shaped tool calls and repair any fields that still come back broken
+        self.structured_output = structured_output
+        # Sharded discovery: one prompt per niche/season instead of one global scan
+        self.niches = niches
+        self.ideas_per_niche = ideas_per_niche
+        self.discovery_workers = discovery_workers
+        # Per-stage latency, token, cost and parse metrics (metrics.MetricsRecorder)
+        self.metrics = metrics or MetricsRecorder()
+        # Opt-in record/replay of every reply (cassette.Cassette)
+        self.cassette = cassette
+        # Where finished cycles go (product_store.ProductStore); None keeps the JSON dumps
+        self.store = store
+        # Identical requests already in flight share one call (singleflight.RequestCoalescer);
+        # False turns this off, None uses the process-wide coalescer
+        self.coalescer = shared_coalescer() if coalescer is None else coalescer or None
+        # Model and max_tokens per stage, with SLO-driven fallback (model_router.ModelRouter)
+        self.router = router or ModelRouter()
+        # AIMD window of the running concurrent cycle (concurrency.AIMDController), if adaptive
+        self.concurrency = None
+        # (stage, model) pairs already warned about a prefix too short to cache
+        self.uncached_prefixes = set()
+        self.reset_usage()
         print("🤖 Agent initialized successfully!")
 
+    @property
+    def async_client(self):
+        """Pooled async client for the running event loop"""
+        return self.http_pool.async_anthropic(self.api_key, self.base_url)
+
+    def create_message(self, stage, **params):
+        """Call messages.create through the response cache, coalescer and shared rate limiter"""
+        key, cached = self.cached_message(stage, params)
+        if cached is not None:
+            return cached
+
+        if self.coalescer is None:
+            return self.request_message(stage, key, params)
+        response, shared = self.coalescer.do(
+            key or request_key(params), lambda: self.request_message(stage, key, params))
+        return self.shared_message(stage, key, response) if shared else response
+
+    def request_message(self, stage, key, params):
+        """Make the call, retrying 429/529 through the rate limiter"""
+        estimate = estimate_tokens(json.dumps([params.get("system"), params["messages"]]),
+                                   params["max_tokens"])
+
+        started = time.monotonic()
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire(estimate)
+            try:
+                raw = self.client.messages.with_raw_response.create(**params)
+                response = raw.parse()
+            except anthropic.APIError as e:
+                self.handle_error(stage, e, attempt, params["model"])
+                continue
+
+            latency = time.monotonic() - started
+            self.metrics.record_call(stage, params["model"], latency, response.usage, retries=attempt)
+            self.observe_call(stage, params["model"], latency)
+            return self.finish_message(stage, key, raw.headers, response, estimate)
+
+    async def create_message_async(self, stage, **params):
+        """Async version of create_message"""
+        key, cached = self.cached_message(stage, params)
+        if cached is not None:
+            return cached
+
+        if self.coalescer is None:
+            return await self.request_message_async(stage, key, params)
+        response, shared = await self.coalescer.do_async(
+            key or request_key(params), lambda: self.request_message_async(stage, key, params))
+        return self.shared_message(stage, key, response) if shared else response
+
+    async def request_message_async(self, stage, key, params):
+        """Async version of request_message"""
+        estimate = estimate_tokens(json.dumps([params.get("system"), params["messages"]]),
+                                   params["max_tokens"])
+
+        started = time.monotonic()
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire_async(estimate)
+            try:
+                raw = await self.async_client.messages.with_raw_response.create(**params)
+                response = await raw.parse()
+            except anthropic.APIError as e:
+                self.handle_error(stage, e, attempt, params["model"])
+                continue
+
+            latency = time.monotonic() - started
+            self.metrics.record_call(stage, params["model"], latency, response.usage, retries=attempt)
+            self.observe_call(stage, params["model"], latency)
+            return self.finish_message(stage, key, raw.headers, response, estimate)
+
+    async def stream_message_async(self, stage, on_text, **params):
+        """Like create_message_async, but passes each text delta to on_text as it arrives"""
+        key, cached = self.cached_message(stage, params)
+        if cached is not None:
+            on_text(self.reply_text(cached))
+            return cached
+
+        if self.coalescer is None:
+            return await self.request_stream_async(stage, key, on_text, params)
+        # Only the leader streams; requests that ride along get the whole reply at once
+        response, shared = await self.coalescer.do_async(
+            key or request_key(params),
+            lambda: self.request_stream_async(stage, key, on_text, params))
+        if not shared:
+            return response
+        on_text(self.reply_text(response))
+        return self.shared_message(stage, key, response)
+
+    async def request_stream_async(self, stage, key, on_text, params):
+        """Streaming version of request_message_async"""
+        estimate = estimate_tokens(json.dumps([params.get("system"), params["messages"]]),
+                                   params["max_tokens"])
+
+        started = time.monotonic()
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire_async(estimate)
+            first_token = None
+            try:
+                async with self.async_client.messages.stream(**params) as stream:
+                    async for event in stream:
+                        if event.type != "content_block_delta":
+                            continue
+                        if first_token is None:
+                            first_token = time.monotonic()
+                        # Forced tool calls stream their input as partial JSON
+                        if event.delta.type == "text_delta":
+                            on_text(event.delta.text)
+                        elif event.delta.type == "input_json_delta":
+                            on_text(event.delta.partial_json)
+                    response = await stream.get_final_message()
+                    headers = stream.response.headers
+            except anthropic.APIError as e:
+                self.handle_error(stage, e, attempt, params["model"])
+                continue
+
+            latency = time.monotonic() - started
+            self.metrics.record_call(stage, params["model"], latency, response.usage, retries=attempt,
+                                     ttft=first_token - started if first_token else None)
+            self.observe_call(stage, params["model"], latency)
+            return self.finish_message(stage, key, headers, response, estimate)
+
+    def observe_call(self, stage, model, latency):
+        """Feed a reply's latency to the model router and the adaptive concurrency window"""
+        self.router.observe(stage, model, latency)
+        if self.concurrency is not None:
+            self.concurrency.observe(stage, latency)
+
+    def handle_error(self, stage, error, attempt, model=None):
+        """Back off and return for a retryable error; record and re-raise anything else"""
+        self.router.observe(stage, model, ok=False)
+        status = getattr(error, "status_code", None)
+        if status in RETRYABLE_STATUS and self.concurrency is not None:
+            self.concurrency.overloaded(status)
+        if status not in RETRYABLE_STATUS or attempt == self.max_retries:
+            self.metrics.record_error(stage, status or type(error).__name__, retries=attempt)
+            raise error
+        self.handle_overload(error, attempt)
+
+    def handle_overload(self, error, attempt):
+        """Back off after a 429/529, honouring retry-after when the API sends one"""
+        print(f"⏳ API returned {error.status_code}, retrying ({attempt + 1}/{self.max_retries})...")
+        self.rate_limiter.update_from_headers(error.response.headers)
+        self.rate_limiter.block(2 ** attempt)
+
+    def cached_message(self, stage, params):
+        """Look a request up in the replay cassette or response cache; returns (key, Message or None)"""
+        if self.cache is None and self.cassette is None:
+            return None, None
+
+        key = request_key(params)
+        if self.cassette is not None and self.cassette.replaying:
+            return None, Message.construct(**self.cassette.play(stage, key))
+
+        data = self.cache.get(stage, key) if self.cache is not None else None
+        if data is None:
+            return key, None
+
+        print(f"💾 Cache hit ({stage})")
+        self.metrics.record_cache_hit(stage)
+        if self.cassette is not None:
+            self.cassette.record(stage, key, data)
+        return key, Message.construct(**data)
+
+    def shared_message(self, stage, key, response):
+        """A reply another caller's identical in-flight request paid for"""
+        print(f"🔗 Coalesced ({stage})")
+        self.metrics.record_coalesced(stage)
+        self.store_message(stage, key, response)
+        return response
+
+    def finish_message(self, stage, key, headers, response, estimate):
+        """Feed headers and real usage back into the rate limiter, then cache the reply"""
+        self.rate_limiter.update_from_headers(headers)
+        usage = response.usage
+        self.rate_limiter.settle(estimate, usage.input_tokens + usage.output_tokens)
+        self.record_usage(usage)
+
+        self.store_message(stage, key, response)
+        return response
+
+    def reset_usage(self):
+        """Zero the per-cycle token counters"""
+        self.usage = {
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0
+        }
+
+    def record_usage(self, usage):
+        """Add one reply's token usage to the per-cycle counters"""
+        for name in self.usage:
+            self.usage[name] += getattr(usage, name, None) or 0
+
+    def tokens_used(self):
+        """All tokens billed so far this cycle"""
+        return sum(self.usage.values())
+
+    def store_message(self, stage, key, response):
+        """Record a reply to the cassette and put it in the response cache, if they are on"""
+        if key is None:
+            return
+        if self.cassette is not None:
+            self.cassette.record(stage, key, response.to_dict())
+        # Truncated replies would never parse, so don't keep them around
+        if self.cache is not None and response.stop_reason != "max_tokens":
+            self.cache.put(stage, key, response.to_dict())
+
+    # Prompts are shared by the sync, async and batch paths. Only these small
+    # per-call suffixes change; the instructions sit in the cached system prefix.
+    def opportunities_prompt(self, niche=None, count=3):
+        """Build the opportunity scanner request"""
+        if niche:
+            return f"Find {count} HIGH-PROFIT digital product ideas in this niche: {niche}"
+        return f"Find {count} HIGH-PROFIT digital product ideas for January 2025."
+
+    def product_prompt(self, opportunity):
+        """Build the product creation request for one opportunity"""
+        return f"""
+        Create a complete digital product for: {opportunity['keyword']}
+        Target: {opportunity['audience']}
+        Price: ${opportunity['price']}
+        """
+
+    def listings_prompt(self, product, price):
+        """Build the marketplace listings request for one product"""
+        return f"""
+        Create optimized marketplace listings for:
+        Title: {product['title']}
+        Description: {product['description']}
+        Price: ${price}
+        """
+
+    def opportunities_params(self, niche=None, count=3):
+        """Messages API parameters for the opportunity scan"""
+        # ~150 tokens per idea on top of the original 3-idea budget
+        model, max_tokens = self.router.select("opportunities",
+                                               min(8192, 1500 + 150 * max(0, count - 3)))
+        return self.with_schema("opportunities", dict(
+            model=model,
+            max_tokens=max_tokens,
+            system=cached_system(OPPORTUNITY_INSTRUCTIONS),
+            messages=[{"role": "user", "content": self.opportunities_prompt(niche, count)}]
+        ))
+
+    def product_params(self, opportunity):
+        """Messages API parameters for one product"""
+        model, max_tokens = self.router.select("product", 3000)
+        return self.with_schema("product", dict(
+            model=model,
+            max_tokens=max_tokens,
+            system=cached_system(PRODUCT_INSTRUCTIONS),
+            messages=[{"role": "user", "content": self.product_prompt(opportunity)}]
+        ))
+
+    def listings_params(self, product, price):
+        """Messages API parameters for one product's listings"""
+        model, max_tokens = self.router.select("listings", 2000)
+        return self.with_schema("listings", dict(
+            model=model,
+            max_tokens=max_tokens,
+            system=cached_system(LISTINGS_INSTRUCTIONS),
+            messages=[{"role": "user", "content": self.listings_prompt(product, price)}]
+        ))
+
+    def with_schema(self, stage, params):
+        """Add the forced tool call for a stage when structured output is on"""
+        if self.structured_output:
+            params.update(tool_params(stage))
+        self.check_cached_prefix(stage, params)
+        return params
+
+    def check_cached_prefix(self, stage, params):
+        """Warn (once per stage and model) when the cache_control'd prefix is too short to be cached"""
+        tokens = cached_prefix_tokens(params)
+        minimum = min_cacheable_tokens(params["model"])
+        if tokens >= minimum or (stage, params["model"]) in self.uncached_prefixes:
+            return
+        self.uncached_prefixes.add((stage, params["model"]))
+        print(f"⚠️ {stage} prompt prefix is ~{tokens} tokens, under the {minimum}-token minimum "
+              f"for caching on {params['model']}: it is billed as plain input")
+
+    def reply_text(self, message):
+        """Text of a reply; a forced tool call's input comes back as JSON text"""
+        for block in message.content:
+            if block.type == "tool_use":
+                return json.dumps(block.input)
+        return "".join(block.text for block in message.content if block.type == "text")
+
+    def extract_json(self, content, open_char, close_char):
+        """Pull the outermost JSON array/object out of a reply, or None"""
+        start = content.find(open_char)
+        end = content.rfind(close_char) + 1
+
+        if start >= 0 and end > start:
+            return json.loads(content[start:end])
+        return None
+
+    def parse_reply(self, message, open_char, close_char, stage=None):
+        """Parse the JSON out of a reply (None for a missing reply), or None"""
+        try:
+            data = self.extract_json(self.reply_text(message), open_char, close_char)
+        except (ValueError, AttributeError):
+            data = None
+        if stage is not None:
+            self.metrics.record_parse(stage, data is not None)
+        return data
+
+    def valid_opportunities(self, opportunities):
+        """Drop opportunities that don't match the schema (structured output only)"""
+        if not self.structured_output or opportunities is None:
+            return opportunities
+
+        valid = [opp for opp in opportunities if not validate(opp, OPPORTUNITY_SCHEMA)]
+        if len(valid) < len(opportunities):
+            print(f"⚠️ Dropped {len(opportunities) - len(valid)} opportunities that did not match the schema")
+        return valid
+
+    def repair_params(self, stage, params, data):
+        """Parameters for a follow-up call asking only for the broken fields, or None"""
+        problems = validate(data, SCHEMAS[stage])
+        fields = invalid_fields(problems)
+        if not fields:
+            return None
+
+        print(f"🔧 Re-asking for {stage} fields: {', '.join(fields)}")
+        self.metrics.record_repair(stage)
+        partial = {key: value for key, value in data.items() if key not in fields}
+        tool = repair_tool(stage, fields)
+        return dict(
+            model=params["model"],
+            max_tokens=params["max_tokens"],
+            system=params["system"],
+            messages=[{"role": "user",
+                       "content": repair_prompt(params["messages"][-1]["content"], partial, problems)}],
+            tools=[tool],
+            tool_choice={"type": "tool", "name": tool["name"]}
+        )
+
+    def merge_repair(self, stage, data, response):
+        """Merge the re-asked fields into the answer; None if it is still invalid"""
+        fixed = self.parse_reply(response, '{', '}') or {}
+        data = dict(data, **fixed)
+        if validate(data, SCHEMAS[stage]):
+            print(f"❌ {stage} still invalid after repair")
+            return None
+        return data
+
+    def repair(self, stage, params, data):
+        """Fix schema problems in parsed output with one targeted follow-up call"""
+        if not self.structured_output:
+            return data
+        if not isinstance(data, dict):
+            data = {}
+
+        repair_params = self.repair_params(stage, params, data)
+        if repair_params is None:
+            return data
+        return self.merge_repair(stage, data, self.create_message(stage, **repair_params))
+
+    async def repair_async(self, stage, params, data):
+        """Async version of repair"""
+        if not self.structured_output:
+            return data
+        if not isinstance(data, dict):
+            data = {}
+
+        repair_params = self.repair_params(stage, params, data)
+        if repair_params is None:
+            return data
+        return self.merge_repair(stage, data, await self.create_message_async(stage, **repair_params))
+
     def find_trending_opportunities(self):
         """Find profitable digital product opportunities"""
         print("🔍 Scanning for trending opportunities...")
 
-        prompt = """
-        You are a digital product opportunity scanner. Find 3 HIGH-PROFIT digital product ideas for January 2025.
-
-        Consider:
-        - New Year productivity trends
-        - Business planning season
-        - AI/automation interest
-        - Side hustle demand
-
-        Return ONLY valid JSON (no other text):
-        [
-            {
-                "keyword": "specific trend",
-                "score": 85,
-                "opportunity": "high", 
-                "price": 29.99,
-                "audience": "target buyer",
-                "reasoning": "why profitable"
-            }
-        ]
-        """
-
         try:
-            response = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=1500,
-                messages=[{"role": "user", "content": prompt}]
-            )
-
-            content = response.content[0].text
-            # Extract JSON
-            start = content.find('[')
-            end = content.rfind(']') + 1
-
-            if start >= 0 and end > start:
-                json_str = content[start:end]
-                opportunities = json.loads(json_str)
+            response = self.create_message("opportunities", **self.opportunities_params())
+
+            opportunities = self.valid_opportunities(
+                self.parse_reply(response, '[', ']', "opportunities"))
+            if opportunities is not None:
                 print(f"✅ Found {len(opportunities)} opportunities!")
                 return opportunities
             else:
@@ -63,49 +539,52 @@ class SimpleProductAgent:
             print(f"❌ Error finding opportunities: {e}")
             return []
 
+    def find_niche_opportunities(self, niche):
+        """Scan one niche for opportunities (one shard of discover_opportunities)"""
+        try:
+            response = self.create_message(
+                "opportunities", **self.opportunities_params(niche, self.ideas_per_niche))
+            opportunities = self.valid_opportunities(
+                self.parse_reply(response, '[', ']', "opportunities"))
+            if opportunities is None:
+                print(f"❌ Could not parse opportunities for niche: {niche}")
+                return []
+            return opportunities
+
+        except Exception as e:
+            print(f"❌ Error scanning niche {niche}: {e}")
+            return []
+
+    def discover_opportunities(self, niches):
+        """Scan every niche in parallel, then drop near-duplicate ideas across shards"""
+        print(f"🔍 Scanning {len(niches)} niches ({self.ideas_per_niche} ideas each)...")
+
+        with ThreadPoolExecutor(max_workers=self.discovery_workers) as pool:
+            shards = list(pool.map(self.find_niche_opportunities, niches))
+        for niche, shard in zip(niches, shards):
+            print(f"   • {niche}: {len(shard)} ideas")
+
+        candidates = [opp for shard in shards for opp in shard]
+        started = time.monotonic()
+        opportunities, duplicates = dedupe_opportunities(candidates)
+        print(f"🧹 Dropped {len(duplicates)} near-duplicate ideas in "
+              f"{time.monotonic() - started:.2f}s")
+        for duplicate, kept in duplicates[:5]:
+            print(f"   • '{duplicate['keyword']}' ≈ '{kept['keyword']}'")
+
+        print(f"✅ Found {len(opportunities)} unique opportunities from {len(candidates)} ideas!")
+        return opportunities
+
     def create_product(self, opportunity):
         """Create a complete digital product"""
         print(f"🏭 Creating product for: {opportunity['keyword']}")
 
-        prompt = f"""
-        Create a complete digital product for: {opportunity['keyword']}
-        Target: {opportunity['audience']}
-        Price: ${opportunity['price']}
-
-        Create a valuable digital guide/ebook with:
-        1. Catchy title
-        2. Sales description 
-        3. Detailed outline (10+ sections)
-        4. First chapter content (500+ words)
-        5. Marketing keywords
-
-        Return ONLY valid JSON:
-        {{
-            "title": "Product Title",
-            "description": "Sales copy description",
-            "outline": ["Section 1", "Section 2", "..."],
-            "sample_content": "First chapter content...",
-            "keywords": ["keyword1", "keyword2"],
-            "platforms": ["Etsy", "Gumroad"]
-        }}
-
-        Make it genuinely valuable and worth ${opportunity['price']}.
-        """
-
         try:
-            response = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=3000,
-                messages=[{"role": "user", "content": prompt}]
-            )
-
-            content = response.content[0].text
-            start = content.find('{')
-            end = content.rfind('}') + 1
-
-            if start >= 0 and end > start:
-                json_str = content[start:end]
-                product = json.loads(json_str)
+            params = self.product_params(opportunity)
+            response = self.create_message("product", **params)
+
+            product = self.repair("product", params, self.parse_reply(response, '{', '}', "product"))
+            if product is not None:
                 print(f"✅ Product created: {product['title']}")
                 return product
             else:
@@ -120,46 +599,12 @@ class SimpleProductAgent:
         """Create marketplace listings"""
         print("🛍️ Creating marketplace listings...")
 
-        prompt = f"""
-        Create optimized marketplace listings for:
-        Title: {product['title']}
-        Description: {product['description']}
-        Price: ${price}
-
-        Create listings for:
-        1. Etsy (title + tags + description)
-        2. Gumroad (title + description)
-
-        Return ONLY valid JSON:
-        {{
-            "etsy": {{
-                "title": "SEO optimized title (under 140 chars)",
-                "tags": ["tag1", "tag2", "tag3"],
-                "description": "Compelling Etsy description"
-            }},
-            "gumroad": {{
-                "title": "Gumroad title",
-                "description": "Gumroad sales description"
-            }}
-        }}
-
-        Optimize for sales conversion and platform algorithms.
-        """
-
         try:
-            response = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=2000,
-                messages=[{"role": "user", "content": prompt}]
-            )
-
-            content = response.content[0].text
-            start = content.find('{')
-            end = content.rfind('}') + 1
-
-            if start >= 0 and end > start:
-                json_str = content[start:end]
-                listings = json.loads(json_str)
+            params = self.listings_params(product, price)
+            response = self.create_message("listings", **params)
+
+            listings = self.repair("listings", params, self.parse_reply(response, '{', '}', "listings"))
+            if listings is not None:
                 print("✅ Listings created!")
                 return listings
             else:
@@ -170,101 +615,621 @@ class SimpleProductAgent:
             print(f"❌ Error creating listings: {e}")
             return None
 
+    async def create_product_async(self, opportunity):
+        """Async version of create_product"""
+        print(f"🏭 Creating product for: {opportunity['keyword']}")
+
+        try:
+            params = self.product_params(opportunity)
+            response = await self.create_message_async("product", **params)
+
+            product = await self.repair_async(
+                "product", params, self.parse_reply(response, '{', '}', "product"))
+            if product is not None:
+                print(f"✅ Product created: {product['title']}")
+                return product
+            else:
+                print(f"❌ Could not parse product for: {opportunity['keyword']}")
+                return None
+
+        except Exception as e:
+            print(f"❌ Error creating product for {opportunity['keyword']}: {e}")
+            return None
+
+    async def create_listings_async(self, product, price):
+        """Async version of create_listings"""
+        print(f"🛍️ Creating marketplace listings for: {product['title']}")
+
+        try:
+            params = self.listings_params(product, price)
+            response = await self.create_message_async("listings", **params)
+
+            listings = await self.repair_async(
+                "listings", params, self.parse_reply(response, '{', '}', "listings"))
+            if listings is not None:
+                print(f"✅ Listings created for: {product['title']}")
+                return listings
+            else:
+                print(f"❌ Could not parse listings for: {product['title']}")
+                return None
+
+        except Exception as e:
+            print(f"❌ Error creating listings for {product['title']}: {e}")
+            return None
+
+    def run_message_batch(self, stage, requests, poll_interval=30):
+        """Submit {custom_id: params} as one Message Batch and wait for the replies"""
+        replies = {}
+        keys = {}
+        pending = []
+        for custom_id, params in requests.items():
+            key, cached = self.cached_message(stage, params)
+            if cached is not None:
+                replies[custom_id] = cached
+            else:
+                keys[custom_id] = key
+                pending.append({"custom_id": custom_id, "params": params})
+
+        if not pending:
+            return replies
+
+        batch = self.client.messages.batches.create(requests=pending)
+        print(f"📨 Submitted {stage} batch {batch.id} ({len(pending)} requests)")
+
+        while batch.processing_status != "ended":
+            time.sleep(poll_interval)
+            batch = self.client.messages.batches.retrieve(batch.id)
+            counts = batch.request_counts
+            print(f"⏳ {stage} batch: {counts.succeeded + counts.errored} done, "
+                  f"{counts.processing} processing")
+
+        for entry in self.client.messages.batches.results(batch.id):
+            if entry.result.type == "succeeded":
+                replies[entry.custom_id] = entry.result.message
+                self.record_usage(entry.result.message.usage)
+                # Batch latency is the whole batch's, so only tokens and (half-price) cost count
+                self.metrics.record_call(stage, entry.result.message.model, None,
+                                         entry.result.message.usage, cost_factor=0.5)
+                self.store_message(stage, keys.get(entry.custom_id), entry.result.message)
+            else:
+                print(f"❌ Batch request {entry.custom_id} {entry.result.type}")
+
+        return replies
+
+    def run_batch_cycle(self, poll_interval=30, journal=None, budget=None, priority=None):
+        """Run the cycle through the Message Batches API (cheaper, not faster)"""
+        journal = journal or self.new_journal()
+        # Products a resumed journal already created count against max_products
+        budget = (budget or Budget()).start(len(journal.created))
+        self.reset_usage()
+        print("🚀 Starting Batch Digital Product Creation Cycle...")
+        print("=" * 50)
+
+        # Step 1: Find opportunities
+        opportunities = self.load_opportunities(journal)
+        if not opportunities:
+            print("❌ No opportunities found. Exiting.")
+            return
+
+        # Step 2: One batch for every missing product the budget allows...
+        queue = OpportunityQueue(opportunities, priority, skip=journal.created | journal.done)
+        todo = []
+        item = queue.pop(budget, self.tokens_used())
+        while item is not None:
+            todo.append(item[0])
+            item = queue.pop(budget, self.tokens_used())
+        replies = self.run_message_batch(
+            "product",
+            {f"product-{i}": self.product_params(opportunities[i]) for i in todo},
+            poll_interval
+        )
+        for i in todo:
+            product = self.repair("product", self.product_params(opportunities[i]),
+                                  self.parse_reply(replies.get(f"product-{i}"), '{', '}', "product"))
+            if product:
+                journal.record_product(i, product)
+                print(f"✅ Product created: {product['title']}")
+            else:
+                print(f"❌ Could not create product for: {opportunities[i]['keyword']}")
+
+        # ...then one batch for all of the missing listings
+        drafts = dict(journal.products)
+        replies = self.run_message_batch(
+            "listings",
+            {f"listings-{i}": self.listings_params(product, opportunities[i]['price'])
+             for i, product in drafts.items()},
+            poll_interval
+        )
+        for i, product in drafts.items():
+            listings = self.repair("listings", self.listings_params(product, opportunities[i]['price']),
+                                   self.parse_reply(replies.get(f"listings-{i}"), '{', '}', "listings"))
+            if listings is None:
+                print(f"❌ Could not parse listings for: {product['title']}")
+            else:
+                journal.record_listings(i, listings)
+
+        # Step 3: Save everything
+        self.report_budget(queue, budget)
+        self.finish_cycle(journal)
+
+    async def create_product_streaming(self, opportunity, on_field):
+        """Streamed create_product; on_field(key, value) fires as each top-level field closes"""
+        print(f"🏭 Streaming product for: {opportunity['keyword']}")
+        parser = IncrementalJSONParser('{')
+        broken = False
+
+        def on_text(text):
+            # A reply the parser chokes on still streams to the end for parse_reply
+            nonlocal broken
+            if broken:
+                return
+            try:
+                fields = parser.feed(text)
+            except ValueError:
+                broken = True
+                return
+            for key, value in fields:
+                on_field(key, value)
+
+        try:
+            params = self.product_params(opportunity)
+            response = await self.stream_message_async("product", on_text, **params)
+
+            product = parser.result if parser.done and not broken else None
+            if product is None:
+                # Fall back to the whole-reply parser (e.g. a truncated or malformed stream)
+                product = self.parse_reply(response, '{', '}', "product")
+            else:
+                self.metrics.record_parse("product", True)
+            product = await self.repair_async("product", params, product)
+            if product is not None:
+                print(f"✅ Product created: {product['title']}")
+                return product
+            else:
+                print(f"❌ Could not parse product for: {opportunity['keyword']}")
+                return None
+
+        except Exception as e:
+            print(f"❌ Error creating product for {opportunity['keyword']}: {e}")
+            return None
+
+    async def process_opportunity_streaming(self, index, opportunity, semaphore, journal):
+        """Stream one product and start its listings as soon as title + description close"""
+        started = time.monotonic()
+        fields = {}
+        headline = asyncio.get_running_loop().create_future()
+
+        def on_field(key, value):
+            fields[key] = value
+            if not headline.done() and "title" in fields and "description" in fields:
+                print(f"⚡ Title + description ready after {time.monotonic() - started:.1f}s: "
+                      f"{fields['title']}")
+                headline.set_result({"title": fields["title"], "description": fields["description"]})
+
+        async def create():
+            async with semaphore:
+                return await self.create_product_streaming(opportunity, on_field)
+
+        async def list_for(product):
+            async with semaphore:
+                return await self.create_listings_async(product, opportunity['price'])
+
+        # A resumed product only needs its listings
+        if index in journal.products:
+            return await self.finish_opportunity_async(
+                index, journal.products[index], list_for(journal.products[index]), journal)
+
+        product_task = asyncio.create_task(create())
+        await asyncio.wait({headline, product_task}, return_when=asyncio.FIRST_COMPLETED)
+
+        # Listings only need the title and description, not the sample chapter
+        listings_task = asyncio.create_task(list_for(headline.result())) if headline.done() else None
+
+        product = await product_task
+        if not product:
+            if listings_task:
+                listings_task.cancel()
+            return False
+
+        journal.record_product(index, product)
+        return await self.finish_opportunity_async(
+            index, product, listings_task or list_for(product), journal)
+
+    async def finish_opportunity_async(self, index, product, listings_call, journal):
+        """Await a product's listings and journal them"""
+        listings = await listings_call
+        if listings is not None:
+            journal.record_listings(index, listings)
+        print(f"✅ Complete product package created: {product['title']}")
+        return True
+
+    def new_journal(self):
+        """Start a fresh journal for a cycle"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = f"digital_products_{timestamp}.journal.jsonl"
+        n = 1
+        while os.path.exists(path):
+            path = f"digital_products_{timestamp}_{n}.journal.jsonl"
+            n += 1
+        journal = CycleJournal(path)
+        print(f"📓 Journal: {journal.path} (resume with --resume {journal.path})")
+        return journal
+
+    def load_opportunities(self, journal):
+        """Opportunities from a resumed journal, or a fresh scan recorded to it"""
+        if journal.opportunities is not None:
+            print(f"📓 Reusing {len(journal.opportunities)} opportunities from the journal")
+            return journal.opportunities
+
+        if self.niches:
+            opportunities = self.discover_opportunities(self.niches)
+        else:
+            opportunities = self.find_trending_opportunities()
+        if opportunities:
+            journal.record_opportunities(opportunities)
+        return opportunities
+
     def save_results(self, opportunities, products):
-        """Save results to file"""
+        """Save results to file, writing products one at a time as they stream in"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"digital_products_{timestamp}.json"
 
-        results = {
-            "timestamp": timestamp,
-            "opportunities": opportunities,
-            "products": products
-        }
+        def indented(value, level):
+            # Same layout json.dump(..., indent=2) gives `level` levels down
+            return json.dumps(value, indent=2).replace("\n", "\n" + "  " * level)
 
         with open(filename, 'w') as f:
-            json.dump(results, f, indent=2)
+            f.write('{\n')
+            f.write(f'  "timestamp": {json.dumps(timestamp)},\n')
+            f.write(f'  "opportunities": {indented(opportunities, 1)},\n')
+            f.write('  "products": [')
+            count = 0
+            for product in products:
+                f.write(',\n    ' if count else '\n    ')
+                f.write(indented(product, 2))
+                count += 1
+            f.write('\n  ]\n}' if count else ']\n}')
 
         print(f"💾 Results saved to: {filename}")
         return filename
 
-    def run_full_cycle(self):
-        """Run complete product creation cycle"""
+    def report_budget(self, queue, budget):
+        """Say why a cycle stopped early, if it did"""
+        if len(queue):
+            reason = budget.exhausted(self.tokens_used())
+            print(f"\n🛑 Budget reached ({reason}): {len(queue)} opportunities left unprocessed")
+
+    def save_to_store(self, opportunities, products):
+        """Write the cycle to the product store in one transaction"""
+        ids = self.store.save_cycle(opportunities, products)
+        if ids:
+            print(f"🗄️ Saved {len(ids)} products to {self.store.path} (ids {ids[0]}-{ids[-1]})")
+        return ids
+
+    def finish_cycle(self, journal):
+        """Write the cycle from the journal to the product store (or a results file) and report"""
+        if journal.created:
+            if self.store is not None:
+                self.save_to_store(journal.opportunities, journal.complete_products())
+                destination = self.store.path
+            else:
+                destination = self.save_results(journal.opportunities, journal.complete_products())
+            self.report_cycle(len(journal.created), destination, journal.path)
+        else:
+            print("❌ No products were created successfully")
+        journal.close()
+
+    def report_cycle(self, product_count, destination, journal_path):
+        """Print the end-of-cycle summary"""
+        print("\n🎉 CYCLE COMPLETE!")
+        print(f"📊 Created {product_count} complete products")
+        print(f"💾 Saved to: {destination}")
+        print("\n📋 Next steps:")
+        print("1. Review the generated products")
+        print("2. Create accounts on Etsy/Gumroad")
+        print("3. List your first product")
+        print("4. Monitor sales and optimize")
+
+        usage = self.usage
+        total_input = (usage["input_tokens"] + usage["cache_creation_input_tokens"]
+                       + usage["cache_read_input_tokens"])
+        print(f"\n🧾 Tokens: {total_input} in, {usage['output_tokens']} out")
+        print(f"🧠 Prompt cache: {usage['cache_read_input_tokens']} read, "
+              f"{usage['cache_creation_input_tokens']} written "
+              f"({usage['cache_read_input_tokens'] / max(total_input, 1):.0%} of input served from cache)")
+        print(f"⏱️ Rate limiter: {self.rate_limiter.stats()}")
+        if self.cache is not None:
+            print(f"💾 Response cache: {self.cache.stats()}")
+        if self.cassette is not None:
+            print(f"📼 Cassette: {self.cassette.stats()}")
+        print(f"🔌 HTTP pool: {self.http_pool.stats()}")
+        if self.coalescer is not None:
+            print(f"🔗 Coalescer: {self.coalescer.stats()}")
+        self.report_metrics(journal_path)
+
+    def report_metrics(self, journal_path):
+        """Print per-stage latency and cost, and export the metrics next to the cycle journal"""
+        pool = self.http_pool.stats()
+        self.metrics.set_gauge("http_pool_requests", pool["requests"],
+                               "HTTP requests sent through the shared pool")
+        self.metrics.set_gauge("http_pool_connections_opened", pool["connections_opened"],
+                               "TCP connections the shared pool had to open")
+        self.metrics.set_gauge("http_pool_reuse_ratio", pool["reuse_ratio"],
+                               "Share of requests sent on a kept-alive connection")
+
+        self.router.export_gauges(self.metrics)
+
+        summary = self.metrics.summary()
+        print(f"\n📈 Stage breakdown (${summary['total_cost_dollars']:.4f} estimated):")
+        for stage, data in summary["stages"].items():
+            latency = data["latency_seconds"] or {}
+            print(f"   • {stage}: {data['calls']} calls, p50 {latency.get('p50', 0):.2f}s, "
+                  f"p95 {latency.get('p95', 0):.2f}s, {data['latency_share']:.0%} of time, "
+                  f"{data['cost_share']:.0%} of cost, {data['parse_failure']} parse failures, "
+                  f"{data['retries']} retries")
+        routes = self.router.stats()
+        for name, data in routes["routes"].items():
+            latency = data["latency_seconds"] or {}
+            print(f"   🔀 {name}: {data['calls']} calls, p50 {latency.get('p50', 0):.2f}s, "
+                  f"p95 {latency.get('p95', 0):.2f}s, {data['error_rate']:.0%} failed attempts")
+        if routes["fallbacks"]:
+            print(f"   🔀 Fallbacks: {routes['fallbacks']} (now on {routes['active']})")
+
+        base = journal_path[:-len(".journal.jsonl")] if journal_path.endswith(".journal.jsonl") else journal_path
+        self.metrics.export(f"{base}.metrics.prom", f"{base}.metrics.json")
+        print(f"📈 Metrics saved to: {base}.metrics.prom, {base}.metrics.json")
+
+    def run_full_cycle(self, journal=None, budget=None, priority=None):
+        """Run complete product creation cycle, best opportunities first"""
+        journal = journal or self.new_journal()
+        # Products a resumed journal already finished count against max_products
+        budget = (budget or Budget(max_products=2)).start(len(journal.done))
+        self.reset_usage()
         print("🚀 Starting Digital Product Creation Cycle...")
         print("=" * 50)
 
         # Step 1: Find opportunities
-        opportunities = self.find_trending_opportunities()
+        opportunities = self.load_opportunities(journal)
         if not opportunities:
             print("❌ No opportunities found. Exiting.")
             return
 
-        products = []
+        # Step 2: Create products for top opportunities until the budget runs out
+        queue = OpportunityQueue(opportunities, priority, skip=journal.done)
+        planned = min(budget.claimed + len(queue), budget.max_products or budget.claimed + len(queue))
+        while True:
+            item = queue.pop(budget, self.tokens_used())
+            if item is None:
+                break
+            i, opp = item
 
-        # Step 2: Create products for top opportunities
-        for i, opp in enumerate(opportunities[:2]):  # Process top 2
-            print(f"\n📦 Processing opportunity {i + 1}/{len(opportunities[:2])}")
+            print(f"\n📦 Processing opportunity {budget.claimed}/{planned}")
             print(f"Topic: {opp['keyword']}")
             print(f"Score: {opp['score']}")
             print(f"Price: ${opp['price']}")
 
-            # Create product
-            product = self.create_product(opp)
+            # Create product (unless a resumed journal already has it)
+            product = journal.products.get(i)
+            if product is None:
+                product = self.create_product(opp)
+                if product:
+                    journal.record_product(i, product)
+
             if product:
                 # Create listings
                 listings = self.create_listings(product, opp['price'])
-
-                # Combine all data
-                complete_product = {
-                    "opportunity": opp,
-                    "product": product,
-                    "listings": listings,
-                    "created_at": datetime.now().isoformat()
-                }
-
-                products.append(complete_product)
+                if listings is not None:
+                    journal.record_listings(i, listings)
 
                 print(f"✅ Complete product package created!")
                 print(f"📝 Title: {product['title']}")
                 print(f"💰 Price: ${opp['price']}")
                 print("-" * 30)
 
-            # Rate limiting
-            time.sleep(5)
-
         # Step 3: Save everything
-        if products:
-            filename = self.save_results(opportunities, products)
-
-            print("\n🎉 CYCLE COMPLETE!")
-            print(f"📊 Created {len(products)} complete products")
-            print(f"💾 Saved to: {filename}")
-            print("\n📋 Next steps:")
-            print("1. Review the generated products")
-            print("2. Create accounts on Etsy/Gumroad")
-            print("3. List your first product")
-            print("4. Monitor sales and optimize")
+        self.report_budget(queue, budget)
+        self.finish_cycle(journal)
+
+    async def process_opportunity_async(self, index, opportunity, semaphore, journal):
+        """Create one product, then its listings as soon as it is ready"""
+        product = journal.products.get(index)
+        if product is None:
+            async with semaphore:
+                product = await self.create_product_async(opportunity)
+            if not product:
+                return False
+            journal.record_product(index, product)
+
+        async def list_for():
+            async with semaphore:
+                return await self.create_listings_async(product, opportunity['price'])
+
+        return await self.finish_opportunity_async(index, product, list_for(), journal)
+
+    async def run_full_cycle_async(self, max_concurrency=5, stream=False, journal=None,
+                                   budget=None, priority=None, adaptive=None):
+        """Run the cycle with workers draining the opportunity queue concurrently.
+
+        With an AIMDController as `adaptive`, it replaces the fixed limit: the
+        number of requests in flight follows observed latency and 429/529s.
+        """
+        journal = journal or self.new_journal()
+        # Products a resumed journal already finished count against max_products
+        budget = (budget or Budget()).start(len(journal.done))
+        self.reset_usage()
+        print("🚀 Starting Concurrent Digital Product Creation Cycle...")
+        if adaptive is not None:
+            adaptive.metrics = adaptive.metrics or self.metrics
+            print(f"⚡ Adaptive concurrent requests: {adaptive.window} "
+                  f"(between {adaptive.minimum} and {adaptive.maximum})")
         else:
-            print("❌ No products were created successfully")
+            print(f"⚡ Max concurrent requests: {max_concurrency}")
+        print("=" * 50)
+
+        # Step 1: Find opportunities (off the event loop, so signals and other tasks still run)
+        opportunities = await asyncio.to_thread(self.load_opportunities, journal)
+        if not opportunities:
+            print("❌ No opportunities found. Exiting.")
+            return
+
+        # Step 2: Workers pull the best remaining opportunity until the budget runs out;
+        # each product chains into its own listings
+        semaphore = adaptive or asyncio.Semaphore(max_concurrency)
+        process = self.process_opportunity_streaming if stream else self.process_opportunity_async
+        queue = OpportunityQueue(opportunities, priority, skip=journal.done)
+
+        async def worker():
+            while True:
+                if adaptive is not None:
+                    # Claim opportunities only as fast as the current window lets them start
+                    await adaptive.admit()
+                try:
+                    item = queue.pop(budget, self.tokens_used())
+                    if item is None:
+                        return
+                    await process(item[0], item[1], semaphore, journal)
+                finally:
+                    if adaptive is not None:
+                        await adaptive.dismiss()
+
+        self.concurrency = adaptive
+        try:
+            workers = adaptive.maximum if adaptive is not None else max_concurrency
+            await asyncio.gather(*(worker() for _ in range(workers)))
+        finally:
+            self.concurrency = None
+
+        # Step 3: Save everything
+        self.report_budget(queue, budget)
+        if adaptive is not None:
+            print(f"⚡ Adaptive concurrency: {adaptive.stats()}")
+        self.finish_cycle(journal)
+
+    def run_concurrent_cycle(self, max_concurrency=5, stream=False, journal=None,
+                             budget=None, priority=None, adaptive=None):
+        """Blocking entry point for the concurrent cycle"""
+        async def run():
+            try:
+                await self.run_full_cycle_async(max_concurrency, stream, journal, budget, priority,
+                                                adaptive)
+            finally:
+                # This loop ends here, and its pooled connections with it
+                await self.http_pool.aclose_async()
+
+        asyncio.run(run())
+
+
+def load_niches(value):
+    """Niches from a file (one per line) or a comma-separated list"""
+    if not value:
+        return None
+    if os.path.exists(value):
+        with open(value, 'r') as f:
+            return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    return [niche.strip() for niche in value.split(',') if niche.strip()]
 
 
 # Main execution
 def main():
+    parser = argparse.ArgumentParser(description="Digital Product Agent")
+    parser.add_argument("--concurrency", type=int, default=0,
+                        help="process all opportunities concurrently with this many requests in flight")
+    parser.add_argument("--adaptive-concurrency", type=int, metavar="MAX",
+                        help="with --concurrency: start there and adapt (AIMD) up to MAX requests "
+                             "in flight, backing off on 429/529s and latency spikes")
+    parser.add_argument("--stream", action="store_true",
+                        help="with --concurrency: stream products and start listings early")
+    parser.add_argument("--batch", action="store_true",
+                        help="generate products through the Message Batches API")
+    parser.add_argument("--base-url",
+                        help="API base URL (e.g. a local fake_anthropic.py server)")
+    parser.add_argument("--structured", action="store_true",
+                        help="force schema-shaped replies and repair missing fields")
+    parser.add_argument("--resume", metavar="JOURNAL",
+                        help="resume a crashed cycle from its journal, redoing only missing work")
+    parser.add_argument("--niches", metavar="FILE_OR_LIST",
+                        help="comma-separated niches/seasons, or a file with one per line, "
+                             "to scan in parallel")
+    parser.add_argument("--ideas-per-niche", type=int, default=10)
+    parser.add_argument("--max-products", type=int,
+                        help="stop after this many products (default: 2 sequential, unlimited otherwise)")
+    parser.add_argument("--max-tokens", type=int,
+                        help="stop starting new products after this many tokens")
+    parser.add_argument("--max-minutes", type=float,
+                        help="stop starting new products after this many minutes")
+    parser.add_argument("--cache", metavar="DIR",
+                        help="reuse replies for unchanged prompts from this on-disk cache")
+    parser.add_argument("--db", default="products.db",
+                        help="product store the cycle is saved to (default: products.db)")
+    parser.add_argument("--json", action="store_true",
+                        help="write a timestamped digital_products_*.json dump instead of using --db")
+    parser.add_argument("--max-connections", type=int, default=100,
+                        help="size of the shared HTTP connection pool")
+    parser.add_argument("--no-http2", action="store_true", help="use HTTP/1.1 keep-alive only")
+    parser.add_argument("--routes", metavar="PRESET_OR_FILE",
+                        help="model and max_tokens per stage: 'single' (default), 'tiered', "
+                             "or a JSON file of {stage: {model, max_tokens, fallback, ...}}")
+    parser.add_argument("--record", metavar="CASSETTE",
+                        help="save every reply of this run to a cassette file (e.g. run.cassette.gz)")
+    parser.add_argument("--replay", metavar="CASSETTE",
+                        help="serve replies from a recorded cassette; no network, no API key")
+    args = parser.parse_args()
+
     print("🚀 Digital Product Agent - Quick Start")
     print("=" * 40)
 
-    # Get API key from user
-    api_key = input("📝 Enter your Claude API key: ").strip()
+    # API key from the environment; only ask when someone is at the terminal
+    # (a replayed run never calls the API)
+    if args.replay:
+        api_key = "replay"
+    else:
+        api_key = os.environ.get("ANTHROPIC_API_KEY", "").strip()
+        if not api_key and sys.stdin.isatty():
+            api_key = input("📝 Enter your Claude API key: ").strip()
 
     if not api_key:
-        print("❌ API key is required!")
+        print("❌ API key is required! Set ANTHROPIC_API_KEY")
         return
 
     try:
         # Initialize agent
-        agent = SimpleProductAgent(api_key)
+        configure_pool(max_connections=args.max_connections,
+                       max_keepalive_connections=min(20, args.max_connections),
+                       http2=not args.no_http2)
+        cache = ResponseCache(args.cache) if args.cache else None
+        cassette = None
+        if args.replay:
+            cassette = Cassette(args.replay, "replay")
+        elif args.record:
+            cassette = Cassette(args.record, "record")
+        agent = SimpleProductAgent(api_key, cache=cache, base_url=args.base_url,
+                                   structured_output=args.structured,
+                                   niches=load_niches(args.niches),
+                                   ideas_per_niche=args.ideas_per_niche,
+                                   cassette=cassette,
+                                   store=None if args.json else ProductStore(args.db),
+                                   router=ModelRouter(load_routes(args.routes)))
+
+        # Run the cycle (picking up where a crashed one stopped, if asked)
+        journal = CycleJournal(args.resume) if args.resume else None
+        budget = None
+        if args.max_products or args.max_tokens or args.max_minutes:
+            budget = Budget(args.max_products, args.max_tokens,
+                            args.max_minutes * 60 if args.max_minutes else None)
+
+        if args.batch:
+            agent.run_batch_cycle(journal=journal, budget=budget)
+        elif args.concurrency > 0:
+            adaptive = None
+            if args.adaptive_concurrency:
+                adaptive = AIMDController(args.concurrency, maximum=args.adaptive_concurrency)
+            agent.run_concurrent_cycle(args.concurrency, args.stream, journal, budget,
+                                       adaptive=adaptive)
+        else:
+            agent.run_full_cycle(journal, budget)
 
-        # Run the cycle
-        agent.run_full_cycle()
+        if cassette is not None:
+            cassette.save()
 
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -272,4 +1237,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,493 @@
+# Local stand-in for the Anthropic Messages API
+# Save as: fake_anthropic.py
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from metrics import cached_prefix_tokens, min_cacheable_tokens
+
+# Canned payloads, picked by what the prompt asks for
+CANNED_OPPORTUNITIES = [
+    {
+        "keyword": "AI productivity planner",
+        "score": 92,
+        "opportunity": "high",
+        "price": 29.99,
+        "audience": "solo entrepreneurs",
+        "reasoning": "New Year planning demand meets AI curiosity"
+    },
+    {
+        "keyword": "side hustle launch kit",
+        "score": 88,
+        "opportunity": "high",
+        "price": 24.99,
+        "audience": "employees starting a side business",
+        "reasoning": "January side hustle searches peak"
+    },
+    {
+        "keyword": "small business budget templates",
+        "score": 81,
+        "opportunity": "medium",
+        "price": 19.99,
+        "audience": "small business owners",
+        "reasoning": "Business planning season drives template sales"
+    }
+]
+
+CANNED_LISTINGS = {
+    "etsy": {
+        "title": "Digital Planner | Instant Download | Productivity Toolkit",
+        "tags": ["digital planner", "productivity", "instant download"],
+        "description": "Everything you need to plan a productive year."
+    },
+    "gumroad": {
+        "title": "The Productivity Toolkit",
+        "description": "A complete, practical toolkit for getting more done."
+    }
+}
+
+
+def prompt_text(body):
+    """Flatten system + message content of a request body into one string"""
+    parts = []
+    system = body.get("system") or ""
+    if isinstance(system, list):
+        parts.extend(block.get("text", "") for block in system)
+    else:
+        parts.append(system)
+
+    for message in body.get("messages", []):
+        content = message.get("content", "")
+        if isinstance(content, list):
+            parts.extend(block.get("text", "") for block in content if isinstance(block, dict))
+        else:
+            parts.append(content)
+    return "\n".join(parts)
+
+
+def latency_sampler(spec, rng=random):
+    """Turn a latency spec into a function returning seconds.
+
+    Specs: "0.2" or "fixed:0.2", "uniform:LOW,HIGH", "normal:MEAN,STDDEV",
+    "lognormal:MEDIAN,SIGMA" (long-tailed, like real API latency).
+    """
+    if callable(spec):
+        return spec
+    if not spec:
+        return lambda: 0.0
+
+    kind, _, args = str(spec).partition(":")
+    if not args:
+        kind, args = "fixed", kind
+    values = [float(v) for v in args.split(",")]
+
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        mu = math.log(values[0])
+        return lambda: rng.lognormvariate(mu, values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def load_payloads(path):
+    """Canned replies from a JSON file with any of "opportunities", "product", "listings"."""
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def request_stage(body):
+    """Which pipeline stage a request body belongs to"""
+    text = prompt_text(body)
+    if "opportunity scanner" in text:
+        return "opportunities"
+    if "marketplace listings" in text:
+        return "listings"
+    return "product"
+
+
+def canned_reply(body, payloads=None):
+    """Pick a canned JSON reply for a request body (payloads overrides the built-in ones)"""
+    text = prompt_text(body)
+    stage = request_stage(body)
+
+    if payloads and stage in payloads:
+        return json.dumps(payloads[stage], indent=2)
+
+    if stage == "opportunities":
+        return json.dumps(CANNED_OPPORTUNITIES, indent=2)
+
+    if stage == "listings":
+        return json.dumps(CANNED_LISTINGS, indent=2)
+
+    match = re.search(r"digital product for: (.+)", text)
+    keyword = match.group(1).strip() if match else "Digital Product"
+    product = {
+        "title": f"The {keyword.title()} Guide",
+        "description": f"A practical, step-by-step guide to {keyword}.",
+        "outline": [f"Section {i}" for i in range(1, 11)],
+        "sample_content": " ".join(["This chapter walks through the fundamentals."] * 80),
+        "keywords": [keyword, "guide", "digital download"],
+        "platforms": ["Etsy", "Gumroad"]
+    }
+    return json.dumps(product, indent=2)
+
+
+def make_content(body, text):
+    """Wrap a canned reply as a text block, or as a tool call when a tool is forced"""
+    tool_choice = body.get("tool_choice") or {}
+    if tool_choice.get("type") != "tool":
+        return {"type": "text", "text": text}
+
+    tool = next(t for t in body.get("tools", []) if t["name"] == tool_choice["name"])
+    value = json.loads(text)
+    properties = tool["input_schema"].get("properties", {})
+    if isinstance(value, list):
+        value = {"opportunities": value}
+    else:
+        # Repair tools only ask for some of the fields
+        value = {key: item for key, item in value.items() if key in properties}
+    return {"type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:24]}",
+            "name": tool["name"], "input": value}
+
+
+def cache_usage(body, prefix_cache):
+    """Fake prompt caching: (tokens written, tokens read) for a cache_control'd system prompt.
+
+    Like the API, prefixes shorter than the model's minimum are not cached.
+    """
+    system = body.get("system")
+    if prefix_cache is None or not isinstance(system, list):
+        return 0, 0
+    if not any(block.get("cache_control") for block in system):
+        return 0, 0
+
+    tokens = cached_prefix_tokens(body)
+    if tokens < min_cacheable_tokens(body.get("model")):
+        return 0, 0
+    prefix = json.dumps([body.get("tools"), system], sort_keys=True)
+    if prefix in prefix_cache:
+        return 0, tokens
+    prefix_cache.add(prefix)
+    return tokens, 0
+
+
+def make_message(body, text, prefix_cache=None):
+    """Build a Messages API response object around `text`"""
+    block = make_content(body, text)
+    written, read = cache_usage(body, prefix_cache)
+    return {
+        "id": f"msg_{uuid.uuid4().hex[:24]}",
+        "type": "message",
+        "role": "assistant",
+        "model": body.get("model", "fake-model"),
+        "content": [block],
+        "stop_reason": "tool_use" if block["type"] == "tool_use" else "end_turn",
+        "stop_sequence": None,
+        "usage": {
+            "input_tokens": max(1, len(prompt_text(body)) // 4 - written - read),
+            "output_tokens": len(text) // 4,
+            "cache_creation_input_tokens": written,
+            "cache_read_input_tokens": read
+        }
+    }
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class FakeAnthropicServer:
+    """Threaded HTTP server faking /v1/messages (plain or streamed) and the
+    Message Batches endpoints.
+
+    Batches report `in_progress` until `batch_delay` seconds have passed and
+    then `ended`, with every request answered by the canned replies.
+
+    For benchmarks, each message can wait `latency` (a latency_sampler spec)
+    before its first token and then emit `tokens_per_second` output tokens;
+    `rate_limit_rate` / `overload_rate` are the chances of answering 429 / 529
+    instead. `payloads` replaces the canned replies per stage.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, batch_delay=1.0, latency=None,
+                 tokens_per_second=None, rate_limit_rate=0.0, overload_rate=0.0,
+                 retry_after=1, payloads=None, seed=None):
+        self.batch_delay = batch_delay
+        self.rng = random.Random(seed)
+        self.latency = latency_sampler(latency, self.rng)
+        self.tokens_per_second = tokens_per_second
+        self.rate_limit_rate = rate_limit_rate
+        self.overload_rate = overload_rate
+        self.retry_after = retry_after
+        self.payloads = payloads
+        self.batches = {}
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.injected = {429: 0, 529: 0}
+        self.prefix_cache = set()
+
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def injected_error(self):
+        """Status code to fail this request with (429/529), or None"""
+        with self.lock:
+            roll = self.rng.random()
+            if roll < self.rate_limit_rate:
+                status = 429
+            elif roll < self.rate_limit_rate + self.overload_rate:
+                status = 529
+            else:
+                return None
+            self.injected[status] += 1
+        return status
+
+    def first_token_delay(self):
+        with self.lock:
+            return self.latency()
+
+    def output_seconds(self, tokens):
+        """Time to generate `tokens` output tokens at the configured rate"""
+        return tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def reply(self, body):
+        return make_message(body, canned_reply(body, self.payloads), self.prefix_cache)
+
+    # Batch bookkeeping
+    def create_batch(self, requests):
+        batch_id = f"msgbatch_{uuid.uuid4().hex[:24]}"
+        with self.lock:
+            self.batches[batch_id] = {"created": time.time(), "requests": requests}
+        return self.batch_object(batch_id)
+
+    def batch_object(self, batch_id):
+        batch = self.batches[batch_id]
+        created = batch["created"]
+        ended = time.time() - created >= self.batch_delay
+        count = len(batch["requests"])
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0 if ended else count,
+                "succeeded": count if ended else 0,
+                "errored": 0,
+                "canceled": 0,
+                "expired": 0
+            },
+            "created_at": _iso(created),
+            "expires_at": _iso(created + 86400),
+            "ended_at": _iso(created + self.batch_delay) if ended else None,
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": f"{self.base_url}/v1/messages/batches/{batch_id}/results" if ended else None
+        }
+
+    def batch_results(self, batch_id):
+        lines = []
+        for request in self.batches[batch_id]["requests"]:
+            params = request["params"]
+            message = self.reply(params)
+            lines.append(json.dumps({
+                "custom_id": request["custom_id"],
+                "result": {"type": "succeeded", "message": message}
+            }))
+        return "\n".join(lines) + "\n"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, so clients can reuse pooled connections
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, payload, content_type="application/json"):
+                data = payload if isinstance(payload, bytes) else payload.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("request-id", f"req_{uuid.uuid4().hex[:24]}")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _event(self, name, payload):
+                self.wfile.write(f"event: {name}\ndata: {json.dumps(payload)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            def _stream(self, message, chunk_size=16):
+                """Send `message` as server-sent events, a few characters per delta"""
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                # No Content-Length on an event stream, so it ends with the connection
+                self.send_header("Connection", "close")
+                self.close_connection = True
+                self.send_header("request-id", f"req_{uuid.uuid4().hex[:24]}")
+                self.end_headers()
+
+                block = message["content"][0]
+                usage = message["usage"]
+                start = dict(message, content=[], stop_reason=None,
+                             usage=dict(usage, output_tokens=1))
+                self._event("message_start", {"type": "message_start", "message": start})
+
+                if block["type"] == "tool_use":
+                    text = json.dumps(block["input"])
+                    opening = dict(block, input={})
+                    delta_type, delta_field = "input_json_delta", "partial_json"
+                else:
+                    text = block["text"]
+                    opening = {"type": "text", "text": ""}
+                    delta_type, delta_field = "text_delta", "text"
+
+                self._event("content_block_start", {"type": "content_block_start", "index": 0,
+                                                    "content_block": opening})
+                # Spread generation time evenly over the deltas
+                pause = server.output_seconds(usage["output_tokens"]) / max(1, len(text) // chunk_size)
+                for i in range(0, len(text), chunk_size):
+                    if pause:
+                        time.sleep(pause)
+                    self._event("content_block_delta", {
+                        "type": "content_block_delta", "index": 0,
+                        "delta": {"type": delta_type, delta_field: text[i:i + chunk_size]}
+                    })
+                self._event("content_block_stop", {"type": "content_block_stop", "index": 0})
+                self._event("message_delta", {
+                    "type": "message_delta",
+                    "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+                    "usage": {"output_tokens": usage["output_tokens"]}
+                })
+                self._event("message_stop", {"type": "message_stop"})
+
+            def _not_found(self):
+                self._send(404, json.dumps({
+                    "type": "error",
+                    "error": {"type": "not_found_error", "message": self.path}
+                }))
+
+            def _error(self, status):
+                error_type = "rate_limit_error" if status == 429 else "overloaded_error"
+                data = json.dumps({
+                    "type": "error",
+                    "error": {"type": error_type, "message": f"Injected {status}"}
+                }).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("retry-after", str(server.retry_after))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _read_body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def do_POST(self):
+                path = self.path.split("?")[0]
+                with server.lock:
+                    server.request_count += 1
+                body = self._read_body()
+
+                if path == "/v1/messages":
+                    status = server.injected_error()
+                    if status:
+                        self._error(status)
+                        return
+                    message = server.reply(body)
+                    time.sleep(server.first_token_delay())
+                    if body.get("stream"):
+                        self._stream(message)
+                    else:
+                        time.sleep(server.output_seconds(message["usage"]["output_tokens"]))
+                        self._send(200, json.dumps(message))
+                elif path == "/v1/messages/batches":
+                    self._send(200, json.dumps(server.create_batch(body["requests"])))
+                else:
+                    self._not_found()
+
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                with server.lock:
+                    server.request_count += 1
+                match = re.fullmatch(r"/v1/messages/batches/([^/]+)(/results)?", path)
+                if not match or match.group(1) not in server.batches:
+                    self._not_found()
+                elif match.group(2):
+                    self._send(200, server.batch_results(match.group(1)), "application/x-jsonl")
+                else:
+                    self._send(200, json.dumps(server.batch_object(match.group(1))))
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Anthropic API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--batch-delay", type=float, default=1.0)
+    parser.add_argument("--latency", default=None,
+                        help='time to first token, e.g. "0.5", "uniform:0.2,1", "lognormal:0.8,0.5"')
+    parser.add_argument("--tokens-per-second", type=float, default=None,
+                        help="output token generation rate (default: instant)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0,
+                        help="fraction of message requests answered with 429")
+    parser.add_argument("--overload-rate", type=float, default=0.0,
+                        help="fraction of message requests answered with 529")
+    parser.add_argument("--payloads", metavar="JSON",
+                        help='file with canned "opportunities", "product" and/or "listings" replies')
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = FakeAnthropicServer(args.host, args.port, batch_delay=args.batch_delay,
+                                 latency=args.latency, tokens_per_second=args.tokens_per_second,
+                                 rate_limit_rate=args.rate_limit_rate,
+                                 overload_rate=args.overload_rate,
+                                 payloads=load_payloads(args.payloads) if args.payloads else None,
+                                 seed=args.seed)
+    print(f"🧪 Fake Anthropic API listening on {server.base_url}")
+    print(f"💡 Point the agent at it with base_url='{server.base_url}'")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# Process-wide Font Registry
+# Save as: fonts.py
+
+import threading
+from collections import OrderedDict
+
+from PIL import ImageFont
+
+# Candidate files per family, tried in order until one loads
+FONT_FAMILIES = {
+    "arial": ("arial.ttf",),
+    "sans": (
+        "arial.ttf", "Arial.ttf",
+        "/System/Library/Fonts/Arial.ttf",
+        "/Windows/Fonts/arial.ttf",
+        "DejaVuSans.ttf"
+    )
+}
+
+# Marks a family none of whose files could be loaded
+DEFAULT_FONT = object()
+
+
+class FontRegistry:
+    """Resolve each font family's file once and keep loaded fonts per (family, size).
+
+    The first lookup of a family walks its candidate files; after that only
+    the resolved file is opened, once per size. Loaded fonts live in a
+    bounded LRU, so a repeated lookup is a dict hit. Families with no
+    loadable file fall back to PIL's default font.
+    """
+
+    def __init__(self, families=None, max_fonts=64):
+        self.lock = threading.Lock()
+        self.families = dict(FONT_FAMILIES, **(families or {}))
+        self.max_fonts = max_fonts
+        self.paths = {}  # family -> resolved file or DEFAULT_FONT
+        self.fonts = OrderedDict()  # (family, size) -> font, least recently used first
+        self.hits = 0
+        self.loads = 0
+        self.failed_loads = 0
+        self.evictions = 0
+
+    def get(self, size, family="sans"):
+        """Font of `family` at `size`, loading it on first use"""
+        key = (family, size)
+        with self.lock:
+            font = self.fonts.get(key)
+            if font is not None:
+                self.fonts.move_to_end(key)
+                self.hits += 1
+                return font
+
+            font = self._load(family, size)
+            self.fonts[key] = font
+            if len(self.fonts) > self.max_fonts:
+                self.fonts.popitem(last=False)
+                self.evictions += 1
+            return font
+
+    def _resolve(self, family, size=12):
+        """File a family's fonts load from (DEFAULT_FONT if none loads); returns (path, font or None)"""
+        path = self.paths.get(family)
+        if path is not None:
+            return path, None
+        # First use of the family: find the first candidate that loads
+        for candidate in self.families[family]:
+            try:
+                font = ImageFont.truetype(candidate, size)
+            except OSError:
+                self.failed_loads += 1
+                continue
+            self.paths[family] = candidate
+            self.loads += 1
+            return candidate, font
+        self.paths[family] = DEFAULT_FONT
+        return DEFAULT_FONT, None
+
+    def _load(self, family, size):
+        path, font = self._resolve(family, size)
+        if font is not None:
+            return font
+        self.loads += 1
+        if path is DEFAULT_FONT:
+            return ImageFont.load_default()
+        return ImageFont.truetype(path, size)
+
+    def resolved(self, family="sans"):
+        """Name of the file a family resolves to ("default" for PIL's built-in font)"""
+        with self.lock:
+            path, _ = self._resolve(family)
+            return "default" if path is DEFAULT_FONT else path
+
+    def stats(self):
+        with self.lock:
+            return {
+                "fonts": len(self.fonts),
+                "hits": self.hits,
+                "loads": self.loads,
+                "failed_loads": self.failed_loads,
+                "evictions": self.evictions,
+                "resolved": {family: "default" if path is DEFAULT_FONT else path
+                             for family, path in self.paths.items()}
+            }
+
+
+_shared_registry = None
+_shared_lock = threading.Lock()
+
+
+def shared_fonts():
+    """The process-wide registry, created on first use"""
+    global _shared_registry
+    with _shared_lock:
+        if _shared_registry is None:
+            _shared_registry = FontRegistry()
+        return _shared_registry
+
+
+def get_font(size, family="sans"):
+    """Font from the process-wide registry"""
+    return shared_fonts().get(size, family)
@@ -0,0 +1,183 @@
+# Shared Pooled HTTP Clients
+# Save as: http_pool.py
+
+import asyncio
+import importlib
+import threading
+import weakref
+
+import anthropic
+
+
+def sdk_http_library():
+    """The httpx-style library the installed anthropic SDK is built on (httpx2 from 1.x, httpx before)"""
+    for cls in anthropic.DefaultHttpxClient.__mro__:
+        if cls.__name__ == "Client":
+            return importlib.import_module(cls.__module__.split(".")[0])
+    return importlib.import_module("httpx")
+
+
+# Limits must come from the same library as the client that receives them
+http_library = sdk_http_library()
+
+try:
+    import h2  # noqa: F401  (the SDK's HTTP library needs it for HTTP/2, via its [http2] extra)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class ConnectionStats:
+    """Counts requests vs. new TCP connections and TLS handshakes via httpcore trace events"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+        self.http2_requests = 0
+
+    def trace(self, event, info):
+        with self.lock:
+            if event == "connection.connect_tcp.complete":
+                self.connections += 1
+            elif event == "connection.start_tls.complete":
+                self.tls_handshakes += 1
+            elif event.endswith("send_request_headers.started"):
+                self.requests += 1
+                if event.startswith("http2."):
+                    self.http2_requests += 1
+
+    async def trace_async(self, event, info):
+        self.trace(event, info)
+
+    def on_request(self, request):
+        request.extensions["trace"] = self.trace
+
+    async def on_request_async(self, request):
+        request.extensions["trace"] = self.trace_async
+
+    def stats(self):
+        with self.lock:
+            reused = max(0, self.requests - self.connections)
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections,
+                "tls_handshakes": self.tls_handshakes,
+                "reused_connections": reused,
+                "reuse_ratio": round(reused / self.requests, 3) if self.requests else 0.0,
+                "http2_requests": self.http2_requests
+            }
+
+
+class HttpClientPool:
+    """One set of keep-alive HTTP connection pools shared by every agent in the process.
+
+    Anthropic clients are handed out per (api_key, base_url) on top of a
+    single client of the SDK's own HTTP library, so agents created per job
+    reuse warm connections instead of paying new TCP/TLS handshakes. Async clients are bound to an
+    event loop, so there is one per running loop.
+    """
+
+    def __init__(self, max_connections=100, max_keepalive_connections=20, keepalive_expiry=120.0,
+                 http2=True, timeout=600.0):
+        self.limits = http_library.Limits(max_connections=max_connections,
+                                          max_keepalive_connections=max_keepalive_connections,
+                                          keepalive_expiry=keepalive_expiry)
+        if http2 and not HTTP2_AVAILABLE:
+            print(f"⚠️ HTTP/2 needs the h2 package (pip install \"{http_library.__name__}[http2]\"); "
+                  "using HTTP/1.1 keep-alive")
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.connection_stats = ConnectionStats()
+
+        self.http_client = None
+        self.clients = {}  # (api_key, base_url) -> anthropic.Anthropic
+        self.async_http_clients = weakref.WeakKeyDictionary()  # loop -> AsyncClient of http_library
+        self.async_clients = weakref.WeakKeyDictionary()  # loop -> {(api_key, base_url): AsyncAnthropic}
+
+    def sync_http_client(self):
+        with self.lock:
+            if self.http_client is None:
+                self.http_client = anthropic.DefaultHttpxClient(
+                    limits=self.limits, http2=self.http2, timeout=self.timeout,
+                    event_hooks={"request": [self.connection_stats.on_request]})
+            return self.http_client
+
+    def async_http_client(self):
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            client = self.async_http_clients.get(loop)
+            if client is None:
+                client = anthropic.DefaultAsyncHttpxClient(
+                    limits=self.limits, http2=self.http2, timeout=self.timeout,
+                    event_hooks={"request": [self.connection_stats.on_request_async]})
+                self.async_http_clients[loop] = client
+            return client
+
+    def anthropic(self, api_key, base_url=None):
+        """Shared sync client; retries are left to the caller"""
+        http_client = self.sync_http_client()
+        with self.lock:
+            key = (api_key, base_url)
+            if key not in self.clients:
+                self.clients[key] = anthropic.Anthropic(api_key=api_key, base_url=base_url,
+                                                        max_retries=0, http_client=http_client)
+            return self.clients[key]
+
+    def async_anthropic(self, api_key, base_url=None):
+        """Shared async client for the running event loop; retries are left to the caller"""
+        http_client = self.async_http_client()
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            clients = self.async_clients.setdefault(loop, {})
+            key = (api_key, base_url)
+            if key not in clients:
+                clients[key] = anthropic.AsyncAnthropic(api_key=api_key, base_url=base_url,
+                                                        max_retries=0, http_client=http_client)
+            return clients[key]
+
+    async def aclose_async(self):
+        """Close the running loop's async connections (call before the loop ends)"""
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            client = self.async_http_clients.pop(loop, None)
+            self.async_clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+    def close(self):
+        with self.lock:
+            if self.http_client is not None:
+                self.http_client.close()
+            self.http_client = None
+            self.clients = {}
+
+    def stats(self):
+        return dict(self.connection_stats.stats(), http2_enabled=self.http2,
+                    max_connections=self.limits.max_connections,
+                    max_keepalive_connections=self.limits.max_keepalive_connections)
+
+
+_shared_pool = None
+_shared_lock = threading.Lock()
+
+
+def configure_pool(**options):
+    """Replace the process-wide pool (call before creating agents)"""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is not None:
+            _shared_pool.close()
+        _shared_pool = HttpClientPool(**options)
+        return _shared_pool
+
+
+def shared_pool():
+    """The process-wide pool, created with default limits on first use"""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = HttpClientPool()
+        return _shared_pool
@@ -1,48 +1,75 @@
 # Automated Etsy Image Creation Agent
 # Save as: image_agent.py
 
+import argparse
 import requests
 import json
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 import textwrap
 import os
 
+from fonts import get_font
+from image_layers import layer_key, shared_layers
+from product_store import ProductStore, add_product_arguments, selected_products
+
 
 class EtsyImageAgent:
-    def __init__(self):
+    # (image name, create method) for every template, in generation order
+    TEMPLATES = (
+        ("main", "create_main_image"),
+        ("whats_included", "create_whats_included_image"),
+        ("benefits", "create_benefits_image"),
+        ("preview", "create_preview_image"),
+        ("instant_download", "create_instant_download_image")
+    )
+    SAVE_PARAMS = {}
+
+    def __init__(self, layers=None):
+        # Static template layers, drawn once per process (image_layers.LayerCache)
+        self.layers = layers or shared_layers()
         self.image_size = (1000, 1000)  # Square format for Etsy
         self.background_color = (255, 255, 255)  # White background
         self.primary_color = (30, 64, 175)  # Blue
         self.secondary_color = (107, 114, 128)  # Gray
         self.accent_color = (34, 197, 94)  # Green
+        self.main_title = ("AI-POWERED", "PRODUCTIVITY", "MATRIX")
+
+    def static_layer(self, template, draw_layer):
+        """Copy of a template's static layer, drawn by draw_layer() on first use"""
+        return self.layers.get(layer_key(self, template, "arial"), draw_layer)
 
     def create_main_image(self, product_data):
         """Create the main product image"""
-        img = Image.new('RGB', self.image_size, self.background_color)
+        img = self.static_layer("main", self.draw_main_layer)
         draw = ImageDraw.Draw(img)
 
-        # Load fonts (you may need to adjust font paths)
-        try:
-            title_font = ImageFont.truetype("arial.ttf", 80)
-            subtitle_font = ImageFont.truetype("arial.ttf", 40)
-            price_font = ImageFont.truetype("arial.ttf", 35)
-        except:
-            title_font = ImageFont.load_default()
-            subtitle_font = ImageFont.load_default()
-            price_font = ImageFont.load_default()
-
-        # Extract product info
-        title = product_data['product']['title']
+        # Only the price line changes from product to product; it sits
+        # 150px below where the title lines end
         price = product_data['opportunity']['price']
+        price_font = get_font(35, "arial")
+        price_text = f"${price} • Digital Download"
+        bbox = draw.textbbox((0, 0), price_text, font=price_font)
+        text_width = bbox[2] - bbox[0]
+        x_pos = (self.image_size[0] - text_width) // 2
+        y_pos = 150 + 90 * len(self.main_title)
+        draw.text((x_pos, y_pos + 150), price_text, fill=self.accent_color, font=price_font)
 
-        # Main title (wrap text)
-        main_title = "AI-POWERED\nPRODUCTIVITY\nMATRIX"
+        return img
+
+    def draw_main_layer(self):
+        """Main image without the price line"""
+        img = Image.new('RGB', self.image_size, self.background_color)
+        draw = ImageDraw.Draw(img)
+
+        # Fonts come from the process-wide registry (fonts.py); adjust paths there
+        title_font = get_font(80, "arial")
+        subtitle_font = get_font(40, "arial")
 
         # Calculate text positions
         y_pos = 150
 
         # Draw main title
-        for line in main_title.split('\n'):
+        for line in self.main_title:
             bbox = draw.textbbox((0, 0), line, font=title_font)
             text_width = bbox[2] - bbox[0]
             x_pos = (self.image_size[0] - text_width) // 2
@@ -56,13 +83,6 @@ class EtsyImageAgent:
         x_pos = (self.image_size[0] - text_width) // 2
         draw.text((x_pos, y_pos + 50), subtitle, fill=self.secondary_color, font=subtitle_font)
 
-        # Price
-        price_text = f"${price} • Digital Download"
-        bbox = draw.textbbox((0, 0), price_text, font=price_font)
-        text_width = bbox[2] - bbox[0]
-        x_pos = (self.image_size[0] - text_width) // 2
-        draw.text((x_pos, y_pos + 150), price_text, fill=self.accent_color, font=price_font)
-
         # Add decorative elements
         self.add_decorative_elements(draw)
 
@@ -70,15 +90,16 @@ class EtsyImageAgent:
 
     def create_whats_included_image(self, product_data):
         """Create 'What's Included' image"""
+        # Nothing on it depends on the product
+        return self.static_layer("whats_included", self.draw_whats_included_layer)
+
+    def draw_whats_included_layer(self):
+        """Static whats included image"""
         img = Image.new('RGB', self.image_size, self.background_color)
         draw = ImageDraw.Draw(img)
 
-        try:
-            title_font = ImageFont.truetype("arial.ttf", 60)
-            text_font = ImageFont.truetype("arial.ttf", 35)
-        except:
-            title_font = ImageFont.load_default()
-            text_font = ImageFont.load_default()
+        title_font = get_font(60, "arial")
+        text_font = get_font(35, "arial")
 
         # Title
         title = "WHAT'S INCLUDED"
@@ -107,15 +128,16 @@ class EtsyImageAgent:
 
     def create_benefits_image(self, product_data):
         """Create benefits/transformation image"""
+        # Nothing on it depends on the product
+        return self.static_layer("benefits", self.draw_benefits_layer)
+
+    def draw_benefits_layer(self):
+        """Static benefits image"""
         img = Image.new('RGB', self.image_size, self.background_color)
         draw = ImageDraw.Draw(img)
 
-        try:
-            title_font = ImageFont.truetype("arial.ttf", 50)
-            text_font = ImageFont.truetype("arial.ttf", 35)
-        except:
-            title_font = ImageFont.load_default()
-            text_font = ImageFont.load_default()
+        title_font = get_font(50, "arial")
+        text_font = get_font(35, "arial")
 
         # Title
         title = "TRANSFORM YOUR PRODUCTIVITY"
@@ -143,15 +165,16 @@ class EtsyImageAgent:
 
     def create_preview_image(self, product_data):
         """Create content preview image"""
+        # Nothing on it depends on the product
+        return self.static_layer("preview", self.draw_preview_layer)
+
+    def draw_preview_layer(self):
+        """Static preview image"""
         img = Image.new('RGB', self.image_size, self.background_color)
         draw = ImageDraw.Draw(img)
 
-        try:
-            title_font = ImageFont.truetype("arial.ttf", 60)
-            text_font = ImageFont.truetype("arial.ttf", 30)
-        except:
-            title_font = ImageFont.load_default()
-            text_font = ImageFont.load_default()
+        title_font = get_font(60, "arial")
+        text_font = get_font(30, "arial")
 
         # Title
         title = "INSIDE PREVIEW"
@@ -189,15 +212,16 @@ class EtsyImageAgent:
 
     def create_instant_download_image(self, product_data):
         """Create instant download info image"""
+        # Nothing on it depends on the product
+        return self.static_layer("instant_download", self.draw_instant_download_layer)
+
+    def draw_instant_download_layer(self):
+        """Static instant download image"""
         img = Image.new('RGB', self.image_size, self.background_color)
         draw = ImageDraw.Draw(img)
 
-        try:
-            title_font = ImageFont.truetype("arial.ttf", 60)
-            text_font = ImageFont.truetype("arial.ttf", 35)
-        except:
-            title_font = ImageFont.load_default()
-            text_font = ImageFont.load_default()
+        title_font = get_font(60, "arial")
+        text_font = get_font(35, "arial")
 
         # Title
         title = "INSTANT DOWNLOAD"
@@ -233,6 +257,9 @@ class EtsyImageAgent:
         draw.rectangle([20, 975, 120, 980], fill=self.accent_color)
         draw.rectangle([880, 975, 980, 980], fill=self.accent_color)
 
+    def image_path(self, output_dir, name):
+        return f"{output_dir}/{name}_image.png"
+
     def generate_all_images(self, product_data, output_dir="etsy_images"):
         """Generate all Etsy images for a product"""
 
@@ -242,18 +269,12 @@ class EtsyImageAgent:
         print("🎨 Generating Etsy images...")
 
         # Generate all images
-        images = {
-            "main": self.create_main_image(product_data),
-            "whats_included": self.create_whats_included_image(product_data),
-            "benefits": self.create_benefits_image(product_data),
-            "preview": self.create_preview_image(product_data),
-            "instant_download": self.create_instant_download_image(product_data)
-        }
+        images = {name: getattr(self, method)(product_data) for name, method in self.TEMPLATES}
 
         # Save all images
         for name, img in images.items():
-            filename = f"{output_dir}/{name}_image.png"
-            img.save(filename)
+            filename = self.image_path(output_dir, name)
+            img.save(filename, **self.SAVE_PARAMS)
             print(f"✅ Created: {filename}")
 
         print(f"\n🎉 All images saved in '{output_dir}' folder!")
@@ -269,18 +290,26 @@ class EtsyImageAgent:
 
 # Usage with your product data
 def main():
-    # Load your product data (replace with your JSON file)
-    with open('digital_products_20250629_102651.json', 'r') as f:
-        data = json.load(f)
-
-    # Use the first product (AI Productivity Planner)
-    product_data = data['products'][0]
-
-    # Create image agent
-    agent = EtsyImageAgent()
-
-    # Generate all images
-    agent.generate_all_images(product_data)
+    parser = argparse.ArgumentParser(description="EtsyImageAgent: images for products in the store")
+    add_product_arguments(parser)
+    parser.add_argument("--output-dir", default="etsy_images")
+    parser.add_argument("--layer-cache", metavar="DIR",
+                        help="also keep the static template layers as PNGs here, for later runs")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="render templates on this many worker processes (default: one by one)")
+    args = parser.parse_args()
+
+    store = None if args.from_json else ProductStore(args.db)
+
+    # Imported here: parallel_render imports this module for its worker processes
+    from parallel_render import render_products
+
+    # Products stream in one at a time, each into its own folder
+    render_products("etsy_image", selected_products(args, store), args.output_dir,
+                    workers=args.workers, store=store, layer_cache=args.layer_cache)
+
+    if store is not None:
+        store.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,127 @@
+# Static Image Layer Cache
+# Save as: image_layers.py
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+from fonts import shared_fonts
+
+# Bump when a template's static drawing changes, so on-disk layers are redrawn
+LAYER_VERSION = 1
+
+
+def layer_key(agent, template, font_family):
+    """Cache key of one agent template.
+
+    Covers everything the static layer depends on besides the drawing code:
+    the agent class, template name, every tuple attribute of the agent (its
+    image size and palette) and the font file the family resolves to.
+    """
+    settings = sorted((name, value) for name, value in vars(agent).items()
+                      if isinstance(value, tuple))
+    fingerprint = repr((LAYER_VERSION, settings, shared_fonts().resolved(font_family)))
+    digest = hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()[:16]
+    return f"{type(agent).__name__}_{template}_{digest}"
+
+
+class LayerCache:
+    """Static template layers, drawn once and copied for every product.
+
+    A template's background, decorations and constant text are rendered the
+    first time its key is asked for and kept in a bounded in-memory LRU;
+    with a directory they are also written as PNGs, so a new process loads
+    them instead of drawing. get() always hands out a copy, ready for the
+    product-specific text.
+    """
+
+    def __init__(self, directory=None, max_layers=64):
+        self.lock = threading.Lock()
+        self.directory = directory
+        self.max_layers = max_layers
+        self.layers = OrderedDict()  # key -> Image, least recently used first
+        self.hits = 0
+        self.disk_hits = 0
+        self.renders = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key, render):
+        """Copy of the layer for `key`, calling render() to draw it on first use"""
+        with self.lock:
+            layer = self.layers.get(key)
+            if layer is not None:
+                self.layers.move_to_end(key)
+                self.hits += 1
+                return layer.copy()
+
+        # Drawn outside the lock; two threads racing on a new key both draw it once
+        layer = self._load(key)
+        if layer is None:
+            layer = render()
+            self._save(key, layer)
+            with self.lock:
+                self.renders += 1
+
+        with self.lock:
+            self.layers[key] = layer
+            self.layers.move_to_end(key)
+            if len(self.layers) > self.max_layers:
+                self.layers.popitem(last=False)
+        return layer.copy()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.png")
+
+    def _load(self, key):
+        if not self.directory or not os.path.exists(self._path(key)):
+            return None
+        try:
+            with Image.open(self._path(key)) as image:
+                layer = image.convert("RGB")
+        except OSError:
+            return None
+        with self.lock:
+            self.disk_hits += 1
+        return layer
+
+    def _save(self, key, layer):
+        if not self.directory:
+            return
+        # Written under another name first so a reader never sees half a file
+        temp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        layer.save(temp_path, format="PNG")
+        os.replace(temp_path, self._path(key))
+
+    def stats(self):
+        with self.lock:
+            return {
+                "layers": len(self.layers),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "renders": self.renders
+            }
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def configure_layers(**options):
+    """Replace the process-wide layer cache (e.g. to add an on-disk directory)"""
+    global _shared_cache
+    with _shared_lock:
+        _shared_cache = LayerCache(**options)
+        return _shared_cache
+
+
+def shared_layers():
+    """The process-wide layer cache, in memory only unless configured"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = LayerCache()
+        return _shared_cache
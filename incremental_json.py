@@ -0,0 +1,110 @@
+# Incremental JSON parser for streamed replies
+# Save as: incremental_json.py
+
+import json
+
+
+class IncrementalJSONParser:
+    """Parse a streamed JSON object/array and hand back top-level fields as they close.
+
+    Text before the first '{' or '[' (a chatty preamble) is skipped; with
+    `expect` set to one of them, only that character starts the root, so a
+    bracket in the preamble is skipped too. For an object, feed() returns
+    (key, value) pairs; for an array, (index, item) pairs. Only the new
+    characters of each chunk are scanned. Malformed JSON raises ValueError.
+    """
+
+    def __init__(self, expect="{["):
+        self.buffer = ""
+        self.pos = 0
+        self.expect = expect
+        self.root = None
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.done = False
+
+        self.segment_start = None  # start of the current key/item at depth 1
+        self.key = None
+        self.value_start = None
+        self.index = 0
+        self.fields = {}
+        self.items = []
+
+    @property
+    def result(self):
+        """Everything parsed so far (the full value once `done`)"""
+        return self.fields if self.root == "{" else self.items
+
+    def feed(self, chunk):
+        """Add streamed text; return the top-level fields completed by it"""
+        self.buffer += chunk
+        completed = []
+
+        while self.pos < len(self.buffer) and not self.done:
+            i = self.pos
+            ch = self.buffer[i]
+            self.pos += 1
+
+            if self.root is None:
+                if ch in self.expect:
+                    self.root = ch
+                    self.depth = 1
+                    self._start_segment(i + 1)
+                continue
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.depth == 1 and self.value_start is not None:
+                        self._complete(i + 1, completed)
+                continue
+
+            if ch == '"':
+                self.in_string = True
+            elif ch in "{[":
+                self.depth += 1
+            elif ch in "}]":
+                self.depth -= 1
+                if self.depth == 1 and self.value_start is not None:
+                    self._complete(i + 1, completed)
+                elif self.depth == 0:
+                    self._complete(i, completed)
+                    self.done = True
+            elif self.depth == 1:
+                if ch == ":" and self.root == "{":
+                    self.key = json.loads(self.buffer[self.segment_start:i].strip())
+                    self.value_start = i + 1
+                elif ch == ",":
+                    self._complete(i, completed)
+                    self._start_segment(i + 1)
+
+        return completed
+
+    def _start_segment(self, start):
+        self.segment_start = start
+        self.key = None
+        # Array items start right away; object values start after the ':'
+        self.value_start = start if self.root == "[" else None
+
+    def _complete(self, end, completed):
+        """Close the pending value ending at `end`, if there is one"""
+        if self.value_start is None:
+            return
+        text = self.buffer[self.value_start:end].strip()
+        self.value_start = None
+        if not text:
+            return
+
+        value = json.loads(text)
+        if self.root == "{":
+            self.fields[self.key] = value
+            completed.append((self.key, value))
+        else:
+            self.items.append(value)
+            completed.append((self.index, value))
+            self.index += 1
@@ -0,0 +1,100 @@
+# Crash-safe Cycle Journal
+# Save as: journal.py
+
+import json
+import os
+from datetime import datetime
+
+
+class CycleJournal:
+    """Append-only JSONL record of a product creation cycle.
+
+    Every opportunity list, product and listing is written (and fsynced) the
+    moment it completes, so a crashed cycle can be resumed from the same file.
+    Only products still waiting for their listings are kept in memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.opportunities = None
+        self.products = {}  # index -> product still missing its listings
+        self.created = set()  # indices with a product
+        self.done = set()  # indices with product and listings
+
+        if os.path.exists(path):
+            self._replay()
+        self.file = open(path, "a")
+
+    def _replay(self):
+        """Rebuild progress from an existing journal"""
+        for entry in self._entries():
+            if entry["type"] == "opportunities":
+                self.opportunities = entry["opportunities"]
+            elif entry["type"] == "product":
+                self.products[entry["index"]] = entry["product"]
+                self.created.add(entry["index"])
+            elif entry["type"] == "listings":
+                self.products.pop(entry["index"], None)
+                self.done.add(entry["index"])
+
+        print(f"📓 Resuming journal {self.path}: {len(self.done)} complete, "
+              f"{len(self.products)} waiting for listings")
+
+    def _entries(self):
+        with open(self.path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-write
+                    continue
+
+    def _append(self, entry):
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def record_opportunities(self, opportunities):
+        self.opportunities = opportunities
+        self._append({"type": "opportunities", "opportunities": opportunities})
+
+    def record_product(self, index, product):
+        self.products[index] = product
+        self.created.add(index)
+        self._append({"type": "product", "index": index, "product": product})
+
+    def record_listings(self, index, listings):
+        self.products.pop(index, None)
+        self.done.add(index)
+        self._append({"type": "listings", "index": index, "listings": listings,
+                      "created_at": datetime.now().isoformat()})
+
+    def complete_products(self):
+        """Stream complete_product records back out of the journal file"""
+        self.file.flush()
+        drafts = {}
+        for entry in self._entries():
+            if entry["type"] == "product":
+                drafts[entry["index"]] = entry["product"]
+            elif entry["type"] == "listings" and entry["index"] in drafts:
+                yield {
+                    "opportunity": self.opportunities[entry["index"]],
+                    "product": drafts.pop(entry["index"]),
+                    "listings": entry["listings"],
+                    "created_at": entry["created_at"]
+                }
+
+        # Products whose listings never came back are still worth saving
+        for index, product in drafts.items():
+            yield {
+                "opportunity": self.opportunities[index],
+                "product": product,
+                "listings": None,
+                "created_at": datetime.now().isoformat()
+            }
+
+    def close(self):
+        self.file.close()
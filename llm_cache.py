@@ -0,0 +1,131 @@
+# Persistent LLM Response Cache
+# Save as: llm_cache.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+# How long a cached reply stays valid, per call type (seconds)
+DEFAULT_TTLS = {
+    "opportunities": 6 * 3600,  # trends go stale quickly
+    "product": 30 * 86400,
+    "listings": 30 * 86400
+}
+
+
+def request_key(params):
+    """SHA-256 of the request parameters (model, max_tokens, prompt and the rest)"""
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Content-addressed on-disk cache of Messages API replies.
+
+    Each entry is one JSON file named after a SHA-256 of the request
+    (model, max_tokens, prompt and any other parameters). File mtimes
+    double as the LRU clock, so the order survives restarts.
+    """
+
+    def __init__(self, directory=".llm_cache", max_bytes=200 * 1024 * 1024,
+                 ttls=None, default_ttl=7 * 86400):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.default_ttl = default_ttl
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+        os.makedirs(directory, exist_ok=True)
+        # key -> (last_used, size); rebuilt from disk so LRU order persists
+        self.index = {}
+        for name in os.listdir(directory):
+            if name.endswith(".json"):
+                stat = os.stat(os.path.join(directory, name))
+                self.index[name[:-5]] = (stat.st_mtime, stat.st_size)
+        self.total_bytes = sum(size for _, size in self.index.values())
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, stage, key):
+        """Return the cached reply dict for `key`, or None"""
+        with self.lock:
+            if key not in self.index:
+                self.misses += 1
+                return None
+
+            path = self._path(key)
+            try:
+                with open(path, "r") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            if time.time() - entry["created"] > self.ttls.get(stage, self.default_ttl):
+                self._remove(key)
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            now = time.time()
+            os.utime(path, (now, now))
+            self.index[key] = (now, self.index[key][1])
+            self.hits += 1
+            return entry["response"]
+
+    def put(self, stage, key, response):
+        """Store a reply dict and evict least recently used entries over the size cap"""
+        entry = {"stage": stage, "created": time.time(), "response": response}
+        data = json.dumps(entry, separators=(",", ":"))
+
+        with self.lock:
+            path = self._path(key)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+            if key in self.index:
+                self.total_bytes -= self.index[key][1]
+            size = len(data.encode("utf-8"))
+            self.index[key] = (time.time(), size)
+            self.total_bytes += size
+
+            if self.total_bytes > self.max_bytes:
+                for old_key, _ in sorted(self.index.items(), key=lambda item: item[1][0]):
+                    if self.total_bytes <= self.max_bytes:
+                        break
+                    if old_key == key:
+                        continue
+                    self._remove(old_key)
+                    self.evictions += 1
+
+    def _remove(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+        _, size = self.index.pop(key, (0, 0))
+        self.total_bytes -= size
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "entries": len(self.index),
+            "bytes": self.total_bytes
+        }
@@ -0,0 +1,296 @@
+# Per-call LLM Metrics
+# Save as: metrics.py
+
+import json
+import random
+import threading
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+# USD per million tokens: input, output, cache write, cache read
+MODEL_PRICES = {
+    "claude-3-5-sonnet-20241022": (3.00, 15.00, 3.75, 0.30),
+    "claude-3-5-haiku-20241022": (0.80, 4.00, 1.00, 0.08),
+    "claude-3-haiku-20240307": (0.25, 1.25, 0.30, 0.03),
+    "claude-3-opus-20240229": (15.00, 75.00, 18.75, 1.50)
+}
+DEFAULT_PRICES = MODEL_PRICES["claude-3-5-sonnet-20241022"]
+
+# Shortest prompt prefix (tools + system) the API caches, in tokens; a
+# cache_control marker on anything shorter is ignored and billed as plain input
+MIN_CACHEABLE_TOKENS = {
+    "claude-3-5-haiku-20241022": 2048,
+    "claude-3-haiku-20240307": 2048
+}
+DEFAULT_MIN_CACHEABLE_TOKENS = 1024
+
+
+def min_cacheable_tokens(model):
+    return MIN_CACHEABLE_TOKENS.get(model, DEFAULT_MIN_CACHEABLE_TOKENS)
+
+
+def cached_prefix_tokens(params):
+    """Rough size (~4 chars/token) of the tools + system prefix a cache_control marker covers"""
+    return len(json.dumps([params.get("tools"), params.get("system")], sort_keys=True)) // 4
+
+
+def call_cost(model, usage):
+    """Estimated USD cost of one reply's usage"""
+    price_in, price_out, price_write, price_read = MODEL_PRICES.get(model, DEFAULT_PRICES)
+    return (
+        (getattr(usage, "input_tokens", 0) or 0) * price_in
+        + (getattr(usage, "output_tokens", 0) or 0) * price_out
+        + (getattr(usage, "cache_creation_input_tokens", 0) or 0) * price_write
+        + (getattr(usage, "cache_read_input_tokens", 0) or 0) * price_read
+    ) / 1_000_000
+
+
+class Histogram:
+    """Cumulative-bucket histogram that also keeps a bounded sample for percentiles"""
+
+    def __init__(self, buckets, max_samples=5000):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.samples = []
+        self.max_samples = max_samples
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+        # Reservoir sampling keeps percentiles honest on long runs
+        if len(self.samples) < self.max_samples:
+            self.samples.append(value)
+        else:
+            slot = random.randrange(self.count)
+            if slot < self.max_samples:
+                self.samples[slot] = value
+
+    def percentile(self, p):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 4),
+            "mean": round(self.sum / self.count, 4) if self.count else 0.0,
+            "p50": round(self.percentile(50), 4),
+            "p95": round(self.percentile(95), 4),
+            "max": round(self.max, 4)
+        }
+
+
+class MetricsRecorder:
+    """Collects latency, time-to-first-token, tokens, cost, parse results and
+    retries per pipeline stage, and exports them as Prometheus text or JSON."""
+
+    HISTOGRAMS = {
+        "llm_request_latency_seconds": ("Wall latency of a messages.create call, retries included",
+                                        LATENCY_BUCKETS),
+        "llm_time_to_first_token_seconds": ("Time until the first streamed token", LATENCY_BUCKETS),
+        "llm_input_tokens": ("Input tokens per call (uncached + cache read + cache write)",
+                             TOKEN_BUCKETS),
+        "llm_output_tokens": ("Output tokens per call", TOKEN_BUCKETS)
+    }
+
+    COUNTERS = {
+        "llm_requests_total": "Calls that returned a reply",
+        "llm_errors_total": "Calls that failed after all retries",
+        "llm_retries_total": "Retries after 429/529 responses",
+        "llm_response_cache_hits_total": "Calls answered from the local response cache",
+        "llm_coalesced_total": "Calls saved by sharing an identical request already in flight",
+        "llm_parse_success_total": "Replies parsed into the expected JSON",
+        "llm_parse_failure_total": "Replies that could not be parsed",
+        "llm_repairs_total": "Follow-up calls re-asking for broken fields",
+        "llm_cache_read_tokens_total": "Prompt cache read tokens",
+        "llm_cache_write_tokens_total": "Prompt cache write tokens",
+        "llm_cost_dollars_total": "Estimated spend in USD"
+    }
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}  # (name, stage) -> Histogram
+        self.counters = {}  # (name, labels) -> value
+        self.gauges = {}  # (name, labels) -> value
+        self.gauge_help = {}
+
+    def _histogram(self, name, stage):
+        key = (name, stage)
+        if key not in self.histograms:
+            self.histograms[key] = Histogram(self.HISTOGRAMS[name][1])
+        return self.histograms[key]
+
+    def _inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def record_call(self, stage, model, latency, usage, retries=0, ttft=None, cost_factor=1.0):
+        """One successful API call (latency None for batch replies, which have no per-call time)"""
+        cache_read = getattr(usage, "cache_read_input_tokens", 0) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", 0) or 0
+        with self.lock:
+            if latency is not None:
+                self._histogram("llm_request_latency_seconds", stage).observe(latency)
+            if ttft is not None:
+                self._histogram("llm_time_to_first_token_seconds", stage).observe(ttft)
+            self._histogram("llm_input_tokens", stage).observe(
+                usage.input_tokens + cache_read + cache_write)
+            self._histogram("llm_output_tokens", stage).observe(usage.output_tokens)
+
+            self._inc("llm_requests_total", stage=stage, model=model)
+            self._inc("llm_retries_total", retries, stage=stage)
+            self._inc("llm_cache_read_tokens_total", cache_read, stage=stage)
+            self._inc("llm_cache_write_tokens_total", cache_write, stage=stage)
+            self._inc("llm_cost_dollars_total", call_cost(model, usage) * cost_factor,
+                      stage=stage, model=model)
+
+    def record_error(self, stage, reason, retries=0):
+        with self.lock:
+            self._inc("llm_errors_total", stage=stage, reason=str(reason))
+            self._inc("llm_retries_total", retries, stage=stage)
+
+    def record_cache_hit(self, stage):
+        with self.lock:
+            self._inc("llm_response_cache_hits_total", stage=stage)
+
+    def record_coalesced(self, stage):
+        with self.lock:
+            self._inc("llm_coalesced_total", stage=stage)
+
+    def record_parse(self, stage, ok):
+        with self.lock:
+            self._inc("llm_parse_success_total" if ok else "llm_parse_failure_total", stage=stage)
+
+    def record_repair(self, stage):
+        with self.lock:
+            self._inc("llm_repairs_total", stage=stage)
+
+    def set_gauge(self, name, value, help_text="", **labels):
+        with self.lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+            if help_text:
+                self.gauge_help[name] = help_text
+
+    def counter(self, name, stage=None):
+        """Sum of a counter, optionally for one stage"""
+        with self.lock:
+            return sum(value for (counter_name, labels), value in self.counters.items()
+                       if counter_name == name and (stage is None or ("stage", stage) in labels))
+
+    def prometheus_text(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            for name, (help_text, buckets) in self.HISTOGRAMS.items():
+                series = [(stage, h) for (h_name, stage), h in sorted(self.histograms.items())
+                          if h_name == name]
+                if not series:
+                    continue
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for stage, histogram in series:
+                    for bound, count in zip(buckets, histogram.counts):
+                        lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                    lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+                    lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+
+            for name, help_text in self.COUNTERS.items():
+                series = [(labels, value) for (c_name, labels), value in sorted(self.counters.items())
+                          if c_name == name]
+                if not series:
+                    continue
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in series:
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+            for name in sorted({g_name for g_name, _ in self.gauges}):
+                lines.append(f"# HELP {name} {self.gauge_help.get(name, name)}")
+                lines.append(f"# TYPE {name} gauge")
+                for (g_name, labels), value in sorted(self.gauges.items()):
+                    if g_name == name:
+                        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Per-stage summary with each stage's share of total latency and cost"""
+        # Snapshot under the lock (other threads keep recording), format after
+        with self.lock:
+            histograms = {key: (h.sum, h.summary()) for key, h in self.histograms.items()}
+            counters = dict(self.counters)
+            gauges = {f"{name}{_labels(labels)}": value
+                      for (name, labels), value in self.gauges.items()}
+
+        def counter(name, stage=None):
+            return sum(value for (counter_name, labels), value in counters.items()
+                       if counter_name == name and (stage is None or ("stage", stage) in labels))
+
+        def histogram(name, stage):
+            entry = histograms.get((name, stage))
+            return entry[1] if entry else None
+
+        stages = sorted({stage for _, stage in histograms}
+                        | {dict(labels).get("stage") for _, labels in counters} - {None})
+        total_latency = sum(total for (name, _), (total, _) in histograms.items()
+                            if name == "llm_request_latency_seconds")
+        total_cost = counter("llm_cost_dollars_total")
+
+        result = {"stages": {}, "total_latency_seconds": round(total_latency, 3),
+                  "total_cost_dollars": round(total_cost, 6)}
+        for stage in stages:
+            latency = histograms.get(("llm_request_latency_seconds", stage))
+            cost = counter("llm_cost_dollars_total", stage)
+            result["stages"][stage] = {
+                "calls": counter("llm_requests_total", stage),
+                "errors": counter("llm_errors_total", stage),
+                "retries": counter("llm_retries_total", stage),
+                "response_cache_hits": counter("llm_response_cache_hits_total", stage),
+                "coalesced": counter("llm_coalesced_total", stage),
+                "parse_success": counter("llm_parse_success_total", stage),
+                "parse_failure": counter("llm_parse_failure_total", stage),
+                "repairs": counter("llm_repairs_total", stage),
+                "latency_seconds": latency[1] if latency else None,
+                "time_to_first_token_seconds": histogram("llm_time_to_first_token_seconds", stage),
+                "input_tokens": histogram("llm_input_tokens", stage),
+                "output_tokens": histogram("llm_output_tokens", stage),
+                "cache_read_tokens": counter("llm_cache_read_tokens_total", stage),
+                "cache_write_tokens": counter("llm_cache_write_tokens_total", stage),
+                "cost_dollars": round(cost, 6),
+                "latency_share": round(latency[0] / total_latency, 3) if latency and total_latency else 0.0,
+                "cost_share": round(cost / total_cost, 3) if total_cost else 0.0
+            }
+
+        result["gauges"] = gauges
+        return result
+
+    def export(self, prometheus_path=None, json_path=None):
+        """Write the Prometheus text and/or JSON summary files"""
+        if prometheus_path:
+            with open(prometheus_path, "w") as f:
+                f.write(self.prometheus_text())
+        if json_path:
+            with open(json_path, "w") as f:
+                json.dump(self.summary(), f, indent=2)
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+def _number(value):
+    return f"{value:.6f}" if isinstance(value, float) else str(value)
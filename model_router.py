@@ -0,0 +1,174 @@
+# Per-stage Model Routing
+# Save as: model_router.py
+
+import json
+import threading
+import time
+from collections import deque
+
+from metrics import Histogram, LATENCY_BUCKETS
+
+SONNET = "claude-3-5-sonnet-20241022"
+HAIKU = "claude-3-5-haiku-20241022"
+
+
+class Route:
+    """Model and token budget for one pipeline stage, with an optional fallback model.
+
+    The route falls back when, over its last `window` calls, the p95 latency
+    goes above `latency_slo` seconds or the share of failed attempts goes
+    above `max_error_rate`. After `cooldown` seconds the primary model gets
+    another chance.
+    """
+
+    def __init__(self, model, max_tokens=None, fallback=None, latency_slo=None,
+                 max_error_rate=None, window=20, min_calls=5, cooldown=300):
+        self.model = model
+        self.max_tokens = max_tokens  # None keeps the stage's own budget
+        self.fallback = fallback
+        self.latency_slo = latency_slo
+        self.max_error_rate = max_error_rate
+        self.window = window
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+# Everything on one model: the behaviour before routing existed
+SINGLE_MODEL_ROUTES = {
+    "opportunities": Route(SONNET),
+    "product": Route(SONNET, 3000),
+    "listings": Route(SONNET, 2000)
+}
+
+# The fast model scans and writes listings; only the product itself (outline
+# and sample chapter) gets the larger model. Each falls back to the other.
+TIERED_ROUTES = {
+    "opportunities": Route(HAIKU, fallback=SONNET, latency_slo=30, max_error_rate=0.2),
+    "product": Route(SONNET, 3000, fallback=HAIKU, latency_slo=90, max_error_rate=0.2),
+    "listings": Route(HAIKU, 1500, fallback=SONNET, latency_slo=20, max_error_rate=0.2)
+}
+
+PRESETS = {"single": SINGLE_MODEL_ROUTES, "tiered": TIERED_ROUTES}
+
+
+def load_routes(value):
+    """Routes from a preset name ("single", "tiered") or a JSON file of {stage: route}"""
+    if not value:
+        return None
+    if value in PRESETS:
+        return PRESETS[value]
+    with open(value, 'r') as f:
+        return {stage: Route.from_dict(route) for stage, route in json.load(f).items()}
+
+
+class ModelRouter:
+    """Pick the model and max_tokens for each stage and fall back on SLO breaches.
+
+    Every call reports back through observe(), which keeps a sliding window
+    of latencies and failures per stage and model, plus per-route latency
+    histograms and call counts for tuning.
+    """
+
+    def __init__(self, routes=None):
+        self.lock = threading.Lock()
+        self.routes = dict(SINGLE_MODEL_ROUTES, **(routes or {}))
+        self.recent = {}  # (stage, model) -> deque of (latency or None, ok)
+        self.fallback_until = {}  # stage -> monotonic time the primary model is retried
+        self.fallbacks = {}  # stage -> times the stage fell back
+        self.latency = {}  # (stage, model) -> Histogram
+        self.calls = {}  # (stage, model) -> [successes, failed attempts]
+
+    def select(self, stage, max_tokens):
+        """(model, max_tokens) for the next call of a stage; max_tokens is the stage default"""
+        route = self.routes[stage]
+        with self.lock:
+            until = self.fallback_until.get(stage)
+            if until is not None and time.monotonic() >= until:
+                # Cooldown over: give the primary model a fresh window
+                del self.fallback_until[stage]
+                self.recent.pop((stage, route.model), None)
+                until = None
+            model = route.fallback if until is not None else route.model
+        return model, route.max_tokens or max_tokens
+
+    def observe(self, stage, model, latency=None, ok=True):
+        """Record one attempt (a reply, or a failed attempt with ok=False)"""
+        route = self.routes.get(stage)
+        if route is None:
+            return
+        key = (stage, model)
+        with self.lock:
+            counts = self.calls.setdefault(key, [0, 0])
+            counts[0 if ok else 1] += 1
+            if latency is not None:
+                if key not in self.latency:
+                    self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.latency[key].observe(latency)
+
+            recent = self.recent.setdefault(key, deque(maxlen=route.window))
+            recent.append((latency, ok))
+            if model != route.model or not route.fallback or stage in self.fallback_until:
+                return
+            reason = self._breach(route, recent)
+            if reason:
+                self.fallback_until[stage] = time.monotonic() + route.cooldown
+                self.fallbacks[stage] = self.fallbacks.get(stage, 0) + 1
+                print(f"🔀 {stage}: {reason}, routing to {route.fallback} "
+                      f"for {route.cooldown:.0f}s")
+
+    def _breach(self, route, recent):
+        """Why the primary model is outside its SLO, or None"""
+        if len(recent) < route.min_calls:
+            return None
+        if route.max_error_rate is not None:
+            error_rate = sum(1 for _, ok in recent if not ok) / len(recent)
+            if error_rate > route.max_error_rate:
+                return f"error rate {error_rate:.0%} over {route.max_error_rate:.0%}"
+        latencies = sorted(latency for latency, ok in recent if ok and latency is not None)
+        if route.latency_slo is not None and len(latencies) >= route.min_calls:
+            p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+            if p95 > route.latency_slo:
+                return f"p95 latency {p95:.1f}s over {route.latency_slo:.0f}s SLO"
+        return None
+
+    def stats(self):
+        """Per-route calls, failed attempts and latency, and the model each stage is on"""
+        with self.lock:
+            routes = {}
+            for (stage, model), (ok, failed) in sorted(self.calls.items()):
+                latency = self.latency.get((stage, model))
+                routes[f"{stage}/{model}"] = {
+                    "calls": ok,
+                    "failed_attempts": failed,
+                    "error_rate": round(failed / (ok + failed), 3),
+                    "latency_seconds": latency.summary() if latency else None
+                }
+            return {
+                "active": {stage: route.fallback if stage in self.fallback_until else route.model
+                           for stage, route in self.routes.items()},
+                "fallbacks": dict(self.fallbacks),
+                "routes": routes
+            }
+
+    def export_gauges(self, metrics):
+        """Put per-route error rates, p95 latencies and active models into a MetricsRecorder"""
+        stats = self.stats()
+        for stage, route in self.routes.items():
+            for model in filter(None, (route.model, route.fallback)):
+                metrics.set_gauge("llm_route_active", int(stats["active"][stage] == model),
+                                  "1 for the model a stage is currently routed to",
+                                  stage=stage, model=model)
+        for stage, count in stats["fallbacks"].items():
+            metrics.set_gauge("llm_route_fallbacks", count,
+                              "Times a stage fell back after an SLO breach", stage=stage)
+        for name, data in stats["routes"].items():
+            stage, model = name.split("/", 1)
+            metrics.set_gauge("llm_route_error_rate", data["error_rate"],
+                              "Share of failed attempts per stage and model", stage=stage, model=model)
+            if data["latency_seconds"]:
+                metrics.set_gauge("llm_route_latency_p95_seconds", data["latency_seconds"]["p95"],
+                                  "p95 reply latency per stage and model", stage=stage, model=model)
@@ -0,0 +1,178 @@
+# Parallel Image Rendering
+# Save as: parallel_render.py
+
+import io
+import multiprocessing
+import os
+import signal
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from better_image_agent import ProfessionalEtsyAgent
+from image_agent import EtsyImageAgent
+from image_layers import LayerCache, configure_layers
+from product_store import image_paths
+
+# Artifact kind -> image agent (same kinds as the product store artifacts)
+IMAGE_AGENTS = {
+    "etsy_image": EtsyImageAgent,
+    "professional_image": ProfessionalEtsyAgent
+}
+
+# One agent per kind in each worker process, built on first use
+_worker_agents = {}
+
+
+def _init_worker(layer_cache):
+    # Ctrl+C is handled by the parent, which owns the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    configure_layers(directory=layer_cache)
+
+
+def render_template(kind, method, product_data):
+    """Worker: draw one template of one product and return it as PNG bytes"""
+    agent = _worker_agents.get(kind)
+    if agent is None:
+        agent = _worker_agents[kind] = IMAGE_AGENTS[kind]()
+    image = getattr(agent, method)(product_data)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", **agent.SAVE_PARAMS)
+    return buffer.getvalue()
+
+
+class ImageRenderPool:
+    """Render image templates on a pool of worker processes.
+
+    Every (product, agent, template) is its own task, so the ten images of
+    one product and the images of a whole batch spread over all cores.
+    Workers draw and PNG-encode; only the encoded bytes come back, and the
+    parent writes them to the same files generate_all_images would.
+    With `layer_cache`, workers share static template layers through that
+    directory instead of each drawing them once.
+    """
+
+    def __init__(self, workers=None, layer_cache=None):
+        self.workers = workers or os.cpu_count() or 1
+        # spawn: workers start clean instead of inheriting the parent's threads and clients
+        self.executor = ProcessPoolExecutor(self.workers,
+                                            mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=_init_worker, initargs=(layer_cache,))
+        self.agents = {kind: agent_class() for kind, agent_class in IMAGE_AGENTS.items()}
+
+    def submit(self, product_data, output_dirs):
+        """Queue every template of one product; output_dirs maps artifact kind to a folder.
+
+        Returns [(kind, path, future)] to hand to collect().
+        """
+        tasks = []
+        for kind, output_dir in output_dirs.items():
+            agent = self.agents[kind]
+            os.makedirs(output_dir, exist_ok=True)
+            for name, method in agent.TEMPLATES:
+                future = self.executor.submit(render_template, kind, method, product_data)
+                tasks.append((kind, agent.image_path(output_dir, name), future))
+        return tasks
+
+    def collect(self, tasks):
+        """Wait for submitted templates and write them; returns {kind: [paths]}.
+
+        Nothing is written unless every template succeeded, so a failed
+        product leaves no half-finished image set behind.
+        """
+        images = [(kind, path, future.result()) for kind, path, future in tasks]
+        outputs = {}
+        for kind, path, data in images:
+            with open(path, "wb") as f:
+                f.write(data)
+            outputs.setdefault(kind, []).append(path)
+        return {kind: sorted(paths) for kind, paths in outputs.items()}
+
+    def render(self, product_data, output_dirs):
+        """All images of one product, templates in parallel"""
+        return self.collect(self.submit(product_data, output_dirs))
+
+    def render_many(self, jobs):
+        """Images for [(product_data, output_dirs)], every template of every product in parallel"""
+        submitted = [self.submit(product_data, output_dirs) for product_data, output_dirs in jobs]
+        return [self.collect(tasks) for tasks in submitted]
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def render_products(kind, products, output_dir, workers=0, store=None, layer_cache=None):
+    """Render the `kind` images of every (product_id, product) into output_dir/product_<id>.
+
+    Products are pulled from the iterable as they are needed, so a whole
+    night of results streams through with at most a few products in memory.
+    With workers > 1 they render on an ImageRenderPool; otherwise one by one
+    with the agent's generate_all_images. A product that fails to render is
+    reported and skipped. Returns the number rendered.
+    """
+    started = time.perf_counter()
+    count = 0
+    failures = 0
+
+    def finished(product_id, product_dir, outputs):
+        nonlocal count
+        count += 1
+        if store is not None and product_id is not None:
+            store.add_artifacts(product_id, kind, outputs)
+        rate = count / max(time.perf_counter() - started, 1e-9) * 60
+        print(f"🖼️ [{count}] {product_dir} ({len(outputs)} images, {rate:.1f} products/min)")
+
+    def failed(product_id, product_dir, error):
+        nonlocal failures
+        failures += 1
+        label = f"product {product_id}" if product_id is not None else product_dir
+        print(f"❌ Could not render {label}: {error}")
+
+    def product_dirs():
+        for n, (product_id, product_data) in enumerate(products):
+            name = f"product_{product_id if product_id is not None else n}"
+            yield product_id, product_data, os.path.join(output_dir, name)
+
+    if workers and workers > 1:
+        with ImageRenderPool(workers, layer_cache) as pool:
+            def collect(product_id, product_dir, tasks):
+                try:
+                    outputs = pool.collect(tasks).get(kind, [])
+                except Exception as e:
+                    failed(product_id, product_dir, e)
+                    return
+                finished(product_id, product_dir, outputs)
+
+            # Enough products queued to keep every worker busy, no more
+            pending = deque()
+            for product_id, product_data, product_dir in product_dirs():
+                try:
+                    tasks = pool.submit(product_data, {kind: product_dir})
+                except Exception as e:
+                    failed(product_id, product_dir, e)
+                    continue
+                pending.append((product_id, product_dir, tasks))
+                if len(pending) >= 2 * workers:
+                    collect(*pending.popleft())
+            while pending:
+                collect(*pending.popleft())
+    else:
+        agent = IMAGE_AGENTS[kind](LayerCache(layer_cache) if layer_cache else None)
+        for product_id, product_data, product_dir in product_dirs():
+            try:
+                agent.generate_all_images(product_data, product_dir)
+            except Exception as e:
+                failed(product_id, product_dir, e)
+                continue
+            finished(product_id, product_dir, image_paths(product_dir))
+
+    elapsed = time.perf_counter() - started
+    skipped = f" ({failures} failed)" if failures else ""
+    print(f"\n🎉 Rendered {count} products into '{output_dir}' in {elapsed:.1f}s{skipped}")
+    return count
@@ -0,0 +1,373 @@
+# SQLite Product Store
+# Save as: product_store.py
+
+import glob
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS opportunities (
+    id INTEGER PRIMARY KEY,
+    keyword TEXT NOT NULL,
+    score REAL,
+    opportunity TEXT,
+    price REAL,
+    audience TEXT,
+    reasoning TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    opportunity_id INTEGER NOT NULL REFERENCES opportunities(id),
+    title TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS listings (
+    product_id INTEGER PRIMARY KEY REFERENCES products(id),
+    data TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    id INTEGER PRIMARY KEY,
+    product_id INTEGER NOT NULL REFERENCES products(id),
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_opportunities_keyword ON opportunities(keyword);
+CREATE INDEX IF NOT EXISTS idx_opportunities_score ON opportunities(score);
+CREATE INDEX IF NOT EXISTS idx_opportunities_price ON opportunities(price);
+CREATE INDEX IF NOT EXISTS idx_products_opportunity ON products(opportunity_id);
+CREATE INDEX IF NOT EXISTS idx_products_created ON products(created_at);
+CREATE INDEX IF NOT EXISTS idx_artifacts_product ON artifacts(product_id, kind);
+"""
+
+PRODUCT_QUERY = """
+SELECT p.id, p.data, p.created_at, l.data AS listings,
+       o.keyword, o.score, o.opportunity, o.price, o.audience, o.reasoning
+FROM products p
+JOIN opportunities o ON o.id = p.opportunity_id
+LEFT JOIN listings l ON l.product_id = p.id
+"""
+
+
+class ProductStore:
+    """Indexed SQLite store for opportunities, products, listings and generated artifacts.
+
+    A cycle is written in one transaction. Products can be looked up by id,
+    or filtered by keyword, score, price and creation date, and are read
+    back one row at a time rather than as a whole dump.
+    """
+
+    def __init__(self, path="products.db"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def save_cycle(self, opportunities, complete_products):
+        """Write a cycle's opportunities and its (streamed) complete products; returns product ids"""
+        now = datetime.now().isoformat()
+        product_ids = []
+        with self.lock, self.db:
+            # Opportunities are matched back to products by content
+            opportunity_ids = {}
+            for opp in opportunities:
+                cursor = self.db.execute(
+                    "INSERT INTO opportunities (keyword, score, opportunity, price, audience, reasoning, "
+                    "created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (str(opp.get('keyword', '')), _number(opp.get('score')), opp.get('opportunity'),
+                     _number(opp.get('price')), opp.get('audience'), opp.get('reasoning'), now))
+                opportunity_ids[_fingerprint(opp)] = cursor.lastrowid
+
+            listings = []
+            for complete in complete_products:
+                opportunity_id = opportunity_ids.get(_fingerprint(complete['opportunity']))
+                if opportunity_id is None:
+                    print(f"⚠️ Not saved: product '{complete['product'].get('title', '')}' "
+                          f"matches none of the cycle's opportunities")
+                    continue
+                created_at = complete.get('created_at') or now
+                cursor = self.db.execute(
+                    "INSERT INTO products (opportunity_id, title, data, created_at) VALUES (?, ?, ?, ?)",
+                    (opportunity_id, complete['product'].get('title', ''),
+                     json.dumps(complete['product']), created_at))
+                product_ids.append(cursor.lastrowid)
+                if complete.get('listings') is not None:
+                    listings.append((cursor.lastrowid, json.dumps(complete['listings']), created_at))
+
+            self.db.executemany(
+                "INSERT INTO listings (product_id, data, created_at) VALUES (?, ?, ?)", listings)
+        return product_ids
+
+    def import_results(self, filename):
+        """Load an old digital_products_<timestamp>.json dump into the store"""
+        with open(filename, 'r') as f:
+            data = json.load(f)
+        return self.save_cycle(data.get('opportunities', []), data.get('products', []))
+
+    def add_artifacts(self, product_id, kind, paths):
+        """Record generated files (images, PDFs) for a product"""
+        now = datetime.now().isoformat()
+        with self.lock, self.db:
+            self.db.executemany(
+                "INSERT INTO artifacts (product_id, kind, path, created_at) VALUES (?, ?, ?, ?)",
+                [(product_id, kind, path, now) for path in paths])
+
+    def artifacts(self, product_id, kind=None):
+        """Paths of a product's generated files, optionally of one kind"""
+        query = "SELECT kind, path FROM artifacts WHERE product_id = ?"
+        args = [product_id]
+        if kind:
+            query += " AND kind = ?"
+            args.append(kind)
+        with self.lock:
+            return [(row['kind'], row['path']) for row in self.db.execute(query + " ORDER BY id", args)]
+
+    def get_product(self, product_id):
+        """One complete product (same shape as the JSON dumps' products), or None"""
+        with self.lock:
+            row = self.db.execute(PRODUCT_QUERY + " WHERE p.id = ?", (product_id,)).fetchone()
+        return _complete_product(row) if row else None
+
+    def latest_product_id(self):
+        with self.lock:
+            row = self.db.execute("SELECT MAX(id) FROM products").fetchone()
+        return row[0]
+
+    def find_products(self, keyword=None, min_score=None, max_score=None, min_price=None,
+                      max_price=None, since=None, until=None, limit=None):
+        """Ids of products matching the filters (keyword is a substring match)"""
+        clauses = []
+        args = []
+        if keyword:
+            clauses.append("o.keyword LIKE ?")
+            args.append(f"%{keyword}%")
+        for column, operator, value in (("o.score", ">=", min_score), ("o.score", "<=", max_score),
+                                        ("o.price", ">=", min_price), ("o.price", "<=", max_price),
+                                        ("p.created_at", ">=", since), ("p.created_at", "<=", until)):
+            if value is not None:
+                clauses.append(f"{column} {operator} ?")
+                args.append(value.isoformat() if isinstance(value, datetime) else value)
+
+        query = "SELECT p.id FROM products p JOIN opportunities o ON o.id = p.opportunity_id"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY p.id"
+        if limit:
+            query += " LIMIT ?"
+            args.append(limit)
+
+        with self.lock:
+            return [row[0] for row in self.db.execute(query, args)]
+
+    def iter_products(self, product_ids=None, **filters):
+        """Stream complete products by id (or by find_products filters), one at a time"""
+        if product_ids is None:
+            product_ids = self.find_products(**filters)
+        for product_id in product_ids:
+            product = self.get_product(product_id)
+            if product is not None:
+                yield product
+
+    def stats(self):
+        with self.lock:
+            return {table: self.db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                    for table in ("opportunities", "products", "listings", "artifacts")}
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _fingerprint(opportunity):
+    return json.dumps(opportunity, sort_keys=True)
+
+
+def _complete_product(row):
+    opportunity = {key: row[key] for key in ("keyword", "score", "opportunity", "price",
+                                             "audience", "reasoning")}
+    return {
+        "id": row["id"],
+        "opportunity": opportunity,
+        "product": json.loads(row["data"]),
+        "listings": json.loads(row["listings"]) if row["listings"] else None,
+        "created_at": row["created_at"]
+    }
+
+
+def add_product_arguments(parser):
+    """CLI options the downstream agents use to pick products from the store"""
+    parser.add_argument("--db", default="products.db", help="product store (default: products.db)")
+    parser.add_argument("--id", type=int, nargs="*", dest="ids",
+                        help="product ids to process (default: the latest product)")
+    parser.add_argument("--keyword", help="process every product whose keyword contains this")
+    parser.add_argument("--min-score", type=float)
+    parser.add_argument("--from-json", metavar="FILE_OR_GLOB", nargs="+",
+                        help="read every product from digital_products_*.json results files "
+                             "(files or quoted globs) instead")
+
+
+def results_files(patterns):
+    """Results files matching any of the paths/globs, in order and without repeats"""
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) or [pattern]
+        files.extend(path for path in matches if path not in files)
+    return files
+
+
+def iter_results_products(path, chunk_size=1 << 16):
+    """Stream the complete products of one results file without loading it all.
+
+    Top-level fields other than "products" are decoded and dropped; products
+    are decoded one at a time as the file is read in chunks.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        buffer, pos, eof = "", 0, False
+
+        def next_char():
+            # Skip whitespace (reading more as needed); returns the next character or ""
+            nonlocal buffer, pos, eof
+            while True:
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    return buffer[pos] if pos < len(buffer) else ""
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+
+        def decode():
+            # Decode the value at pos, reading more until it is complete
+            nonlocal buffer, pos, eof
+            while True:
+                next_char()
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                except ValueError:
+                    if eof:
+                        raise
+                    chunk = f.read(chunk_size)
+                    eof = not chunk
+                    buffer, pos = buffer[pos:] + chunk, 0
+                    continue
+                # A number at the end of the buffer might continue in the next chunk
+                if end == len(buffer) and not eof and not isinstance(value, (dict, list, str)):
+                    chunk = f.read(chunk_size)
+                    eof = not chunk
+                    buffer += chunk
+                    continue
+                pos = end
+                return value
+
+        def expect(chars):
+            nonlocal pos
+            ch = next_char()
+            if ch not in chars:
+                raise ValueError(f"{path}: expected one of {chars!r} at offset {pos}, found {ch!r}")
+            pos += 1
+            return ch
+
+        expect("{")
+        if next_char() == "}":
+            return
+        while True:
+            key = decode()
+            expect(":")
+            if key != "products":
+                decode()
+            else:
+                expect("[")
+                if next_char() == "]":
+                    pos += 1
+                else:
+                    yield decode()
+                    while expect(",]") == ",":
+                        yield decode()
+            if expect(",}") == "}":
+                return
+
+
+def selected_products(args, store):
+    """Yield (product_id, complete_product) for the products the CLI options select"""
+    if args.from_json:
+        for path in results_files(args.from_json):
+            for product in iter_results_products(path):
+                yield None, product
+        return
+
+    if args.ids:
+        ids = args.ids
+    elif args.keyword or args.min_score is not None:
+        ids = store.find_products(keyword=args.keyword, min_score=args.min_score)
+    else:
+        latest = store.latest_product_id()
+        ids = [latest] if latest is not None else []
+
+    if not ids:
+        print(f"❌ No matching products in {store.path}")
+    for product in store.iter_products(ids):
+        yield product['id'], product
+
+
+def image_paths(output_dir):
+    """PNG files an image agent wrote to a directory"""
+    return [os.path.join(output_dir, name) for name in sorted(os.listdir(output_dir))
+            if name.endswith(".png")]
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query or import into the product store")
+    parser.add_argument("--db", default="products.db")
+    parser.add_argument("--import", dest="imports", nargs="*", metavar="JSON",
+                        help="load old digital_products_*.json dumps")
+    parser.add_argument("--keyword")
+    parser.add_argument("--min-score", type=float)
+    parser.add_argument("--max-price", type=float)
+    parser.add_argument("--since", help="ISO date, e.g. 2025-01-01")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    with ProductStore(args.db) as store:
+        for filename in args.imports or []:
+            ids = store.import_results(filename)
+            print(f"🗄️ Imported {len(ids)} products from {filename}")
+
+        for product in store.iter_products(keyword=args.keyword, min_score=args.min_score,
+                                           max_price=args.max_price, since=args.since,
+                                           limit=args.limit):
+            opp = product['opportunity']
+            # Scores and prices that weren't numbers are stored as NULL
+            score = '-' if opp['score'] is None else f"{opp['score']:.0f}"
+            price = '-' if opp['price'] is None else opp['price']
+            print(f"{product['id']:>5}  {score:>5}  ${price:<7}  "
+                  f"{product['created_at'][:10]}  {product['product']['title']}")
+        print(f"📊 {store.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+# Adaptive Rate Limiter for Claude API calls
+# Save as: rate_limiter.py
+
+import asyncio
+import multiprocessing
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class RateLimiter:
+    """Token buckets for requests-per-minute and tokens-per-minute budgets.
+
+    One instance can be shared by every agent (sync or async) in the process.
+    The budgets start from the values passed in and then follow the
+    anthropic-ratelimit-* headers the API sends back.
+    """
+
+    def __init__(self, requests_per_minute=50, tokens_per_minute=40000):
+        self.lock = threading.Lock()
+        self.request_limit = float(requests_per_minute)
+        self.token_limit = float(tokens_per_minute)
+        self.request_level = self.request_limit
+        self.token_level = self.token_limit
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+        self.total_wait = 0.0
+        self.throttled = 0
+
+    def _refill(self, now):
+        """Top up both buckets for the time elapsed since the last call"""
+        elapsed = now - self.updated_at
+        self.updated_at = now
+        self.request_level = min(self.request_limit,
+                                 self.request_level + elapsed * self.request_limit / 60.0)
+        self.token_level = min(self.token_limit,
+                               self.token_level + elapsed * self.token_limit / 60.0)
+
+    def reserve(self, tokens):
+        """Take one request and `tokens` tokens if available, else return seconds to wait"""
+        # Never ask for more than a full bucket, or we would wait forever
+        tokens = min(float(tokens), self.token_limit)
+
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            if now < self.blocked_until:
+                return self.blocked_until - now
+
+            request_wait = (1 - self.request_level) * 60.0 / self.request_limit
+            token_wait = (tokens - self.token_level) * 60.0 / self.token_limit
+            wait = max(request_wait, token_wait)
+            if wait > 0:
+                return wait
+
+            self.request_level -= 1
+            self.token_level -= tokens
+            return 0.0
+
+    def acquire(self, tokens=1):
+        """Block until the call fits in both budgets"""
+        while True:
+            wait = self.reserve(tokens)
+            if wait <= 0:
+                return
+            self.total_wait += wait
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens=1):
+        """Async version of acquire"""
+        while True:
+            wait = self.reserve(tokens)
+            if wait <= 0:
+                return
+            self.total_wait += wait
+            await asyncio.sleep(wait)
+
+    def settle(self, estimated_tokens, actual_tokens):
+        """Give back (or charge) the difference between the estimate and real usage"""
+        with self.lock:
+            self.token_level = min(self.token_limit,
+                                   self.token_level + estimated_tokens - actual_tokens)
+
+    def block(self, seconds):
+        """Hold every caller back for `seconds` (used for backoff after a 429/529)"""
+        with self.lock:
+            self.throttled += 1
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def update_from_headers(self, headers):
+        """Adapt the budgets to the rate-limit headers of a response"""
+        if headers is None:
+            return
+
+        with self.lock:
+            self._refill(time.monotonic())
+
+            request_limit = _header_number(headers, "anthropic-ratelimit-requests-limit")
+            if request_limit:
+                self.request_limit = request_limit
+            request_remaining = _header_number(headers, "anthropic-ratelimit-requests-remaining")
+            if request_remaining is not None:
+                self.request_level = min(self.request_level, request_remaining)
+
+            token_limit = _header_number(headers, "anthropic-ratelimit-tokens-limit")
+            if token_limit:
+                self.token_limit = token_limit
+            token_remaining = _header_number(headers, "anthropic-ratelimit-tokens-remaining")
+            if token_remaining is not None:
+                self.token_level = min(self.token_level, token_remaining)
+
+            retry_after = _header_number(headers, "retry-after")
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            elif request_remaining == 0 or token_remaining == 0:
+                # Out of quota without a retry-after: wait for the earliest reset
+                reset = _seconds_until(headers.get("anthropic-ratelimit-requests-reset")
+                                       if request_remaining == 0
+                                       else headers.get("anthropic-ratelimit-tokens-reset"))
+                if reset:
+                    self.blocked_until = max(self.blocked_until, time.monotonic() + reset)
+
+    def stats(self):
+        """Current budgets and how much time callers spent waiting"""
+        with self.lock:
+            self._refill(time.monotonic())
+            return {
+                "requests_per_minute": self.request_limit,
+                "tokens_per_minute": self.token_limit,
+                "requests_available": round(self.request_level, 2),
+                "tokens_available": round(self.token_level),
+                "throttled_responses": self.throttled,
+                "total_wait_seconds": round(self.total_wait, 2)
+            }
+
+
+def _shared_field(index):
+    """Property backed by one slot of SharedRateLimiter.state"""
+    def get(self):
+        return self.state[index]
+
+    def set(self, value):
+        self.state[index] = value
+
+    return property(get, set)
+
+
+class SharedRateLimiter(RateLimiter):
+    """RateLimiter whose buckets live in shared memory, so worker processes share one budget.
+
+    Create it in the parent and hand it to each multiprocessing.Process; every
+    process then draws from (and adapts) the same requests/tokens per minute.
+    time.monotonic() is system-wide, so the refill clock is shared as well.
+    """
+
+    FIELDS = ("request_limit", "token_limit", "request_level", "token_level", "updated_at",
+              "blocked_until", "total_wait", "throttled")
+
+    request_limit = _shared_field(0)
+    token_limit = _shared_field(1)
+    request_level = _shared_field(2)
+    token_level = _shared_field(3)
+    updated_at = _shared_field(4)
+    blocked_until = _shared_field(5)
+    total_wait = _shared_field(6)
+    throttled = _shared_field(7)
+
+    def __init__(self, requests_per_minute=50, tokens_per_minute=40000, context=None):
+        context = context or multiprocessing.get_context()
+        # Plain shared doubles, guarded by one cross-process lock instead of a thread lock
+        self.state = context.Array("d", len(self.FIELDS), lock=False)
+        super().__init__(requests_per_minute, tokens_per_minute)
+        self.lock = context.Lock()
+
+
+def estimate_tokens(text, max_tokens=0):
+    """Rough token estimate for a prompt plus its output budget (~4 chars/token)"""
+    return len(text) // 4 + max_tokens
+
+
+def _header_number(headers, name):
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _seconds_until(timestamp):
+    """Seconds from now until an RFC 3339 reset timestamp"""
+    if not timestamp:
+        return None
+    try:
+        reset = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return max(0.0, (reset - datetime.now(timezone.utc)).total_seconds())
@@ -0,0 +1,206 @@
+# Product Rendering Pipeline (PDF report + Etsy images)
+# Save as: render_pipeline.py
+
+import os
+import textwrap
+import time
+import unicodedata
+
+from better_image_agent import ProfessionalEtsyAgent
+from content_agent import ModernBusinessReportTemplate
+from image_agent import EtsyImageAgent
+from product_store import image_paths
+
+
+# Typographic characters models like to use, spelled in latin-1
+PDF_REPLACEMENTS = str.maketrans({
+    "\u2018": "'", "\u2019": "'", "\u201a": "'", "\u201c": '"', "\u201d": '"', "\u201e": '"',
+    "\u2013": "-", "\u2014": "-", "\u2212": "-", "\u2026": "...", "\u2022": "-",
+    "\u00a0": " ", "\u200b": ""
+})
+
+
+def pdf_text(value):
+    """Text (or lists/dicts of it) the PDF's core fonts can draw: latin-1 only.
+
+    Typographic punctuation gets its plain equivalent, accented letters
+    outside latin-1 lose their accent, and anything else (emoji) is dropped.
+    """
+    if isinstance(value, dict):
+        return {key: pdf_text(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [pdf_text(item) for item in value]
+    if not isinstance(value, str):
+        return value
+    text = value.translate(PDF_REPLACEMENTS)
+    try:
+        text.encode("latin-1")
+        return text
+    except UnicodeEncodeError:
+        pass
+    # Decompose only the characters latin-1 lacks, keeping é and friends intact
+    safe = []
+    for ch in text:
+        if ord(ch) > 0xff:
+            ch = unicodedata.normalize("NFKD", ch)
+        safe.append(ch.encode("latin-1", "ignore").decode("latin-1"))
+    return "".join(safe)
+
+
+def report_sections(complete_product):
+    """ModernBusinessReportTemplate sections for one generated product (latin-1 safe)"""
+    product = pdf_text(complete_product['product'])
+    opportunity = complete_product['opportunity']
+    outline = product.get('outline') or []
+    lines = textwrap.wrap(product.get('sample_content', ''), 90)
+
+    return {
+        'cover_label': 'DIGITAL GUIDE',
+        'executive_summary': textwrap.wrap(product.get('description', ''), 90)[:4],
+        'stats': [
+            {'number': f"${opportunity['price']}", 'label': "Price"},
+            {'number': str(opportunity['score']), 'label': "Score"},
+            {'number': str(len(outline)), 'label': "Sections"}
+        ],
+        'chapters': [{
+            'title': outline[0] if outline else product['title'],
+            'sections': [
+                {'type': 'section_title', 'content': 'Overview'},
+                {'type': 'body_text', 'content': lines[:40]},
+                {'type': 'table', 'headers': ['Section', 'Topic'],
+                 'data': [[str(i), title[:40]] for i, title in enumerate(outline, 1)]}
+            ]
+        }]
+    }
+
+
+class ProductRenderer:
+    """Render a complete product to its PDF report and both Etsy image sets.
+
+    The image agents are created once and reused, so a long-running process
+    keeps them warm. Per-stage timings are kept for benchmarks, and outputs
+    of stored products are recorded as artifacts.
+    """
+
+    # parallel_images: wall time of a batch's images on the image pool
+    STAGES = ("pdf", "etsy_images", "professional_images", "parallel_images")
+
+    def __init__(self, store=None, pdf=True, images=True, image_pool=None):
+        self.store = store
+        self.pdf = pdf
+        self.images = images
+        # Optional parallel_render.ImageRenderPool; images then render on its worker processes
+        self.image_pool = image_pool
+        self.etsy_agent = EtsyImageAgent()
+        self.professional_agent = ProfessionalEtsyAgent()
+        self.timings = {stage: [] for stage in self.STAGES}
+
+    def timed(self, stage, call, *args):
+        started = time.perf_counter()
+        result = call(*args)
+        self.timings[stage].append(time.perf_counter() - started)
+        return result
+
+    def render_pdf(self, complete_product, path):
+        product = pdf_text(complete_product['product'])
+        # An FPDF document can only be written once, so each report gets a new template
+        return ModernBusinessReportTemplate().create_custom_report(
+            product['title'], product['description'][:90], report_sections(complete_product), path)
+
+    def image_dirs(self, output_dir):
+        """Folder for each kind of image under a product's output_dir"""
+        return {"etsy_image": os.path.join(output_dir, "etsy_images"),
+                "professional_image": os.path.join(output_dir, "professional_etsy_images")}
+
+    def render(self, complete_product, output_dir, product_id=None):
+        """Write one product's outputs under output_dir; returns {kind: [paths]}"""
+        if self.images and self.image_pool is not None:
+            outputs = self.render_pooled([(complete_product, output_dir, product_id)])[0]
+            if isinstance(outputs, Exception):
+                raise outputs
+            return outputs
+
+        os.makedirs(output_dir, exist_ok=True)
+        outputs = {}
+        if self.pdf:
+            outputs["pdf"] = [self.timed("pdf", self.render_pdf, complete_product,
+                                         os.path.join(output_dir, "report.pdf"))]
+        if self.images:
+            image_dirs = self.image_dirs(output_dir)
+            etsy_dir = self.timed("etsy_images", self.etsy_agent.generate_all_images,
+                                  complete_product, image_dirs["etsy_image"])
+            outputs["etsy_image"] = image_paths(etsy_dir)
+            professional_dir = self.timed("professional_images",
+                                          self.professional_agent.generate_all_images,
+                                          complete_product, image_dirs["professional_image"])
+            outputs["professional_image"] = image_paths(professional_dir)
+
+        self.record_artifacts(product_id, outputs)
+        return outputs
+
+    def render_batch(self, items):
+        """Render [(complete_product, output_dir, product_id)]; returns {kind: [paths]} per item.
+
+        A product that fails to render is reported and left as None; the rest
+        of the batch still renders.
+        """
+        if not self.images or self.image_pool is None:
+            results = []
+            for item in items:
+                try:
+                    results.append(self.render(*item))
+                except Exception as e:
+                    results.append(e)
+        else:
+            results = self.render_pooled(items)
+
+        for (_, output_dir, _), outputs in zip(items, results):
+            if isinstance(outputs, Exception):
+                print(f"❌ Could not render {output_dir}: {outputs}")
+        return [None if isinstance(outputs, Exception) else outputs for outputs in results]
+
+    def render_pooled(self, items):
+        """render_batch on the image pool; a failed item's entry is its exception.
+
+        Every image of the batch is queued first, and the PDFs are written
+        here while the workers draw.
+        """
+        started = time.perf_counter()
+        submitted = []
+        for complete_product, output_dir, _ in items:
+            try:
+                os.makedirs(output_dir, exist_ok=True)
+                submitted.append(self.image_pool.submit(complete_product, self.image_dirs(output_dir)))
+            except Exception as e:
+                submitted.append(e)
+
+        results = []
+        for (complete_product, output_dir, _), tasks in zip(items, submitted):
+            outputs = {}
+            try:
+                if self.pdf:
+                    outputs["pdf"] = [self.timed("pdf", self.render_pdf, complete_product,
+                                                 os.path.join(output_dir, "report.pdf"))]
+            except Exception as e:
+                outputs = e
+            results.append(tasks if isinstance(tasks, Exception) else outputs)
+
+        for n, ((_, _, product_id), tasks) in enumerate(zip(items, submitted)):
+            if isinstance(tasks, Exception):
+                continue
+            try:
+                # Collected even after a failed PDF, so no image is left behind in the pool
+                images = self.image_pool.collect(tasks)
+            except Exception as e:
+                results[n] = e
+                continue
+            if not isinstance(results[n], Exception):
+                results[n].update(images)
+                self.record_artifacts(product_id, results[n])
+        self.timings["parallel_images"].append(time.perf_counter() - started)
+        return results
+
+    def record_artifacts(self, product_id, outputs):
+        if self.store is not None and product_id is not None:
+            for kind, paths in outputs.items():
+                self.store.add_artifacts(product_id, kind, paths)
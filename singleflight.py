@@ -0,0 +1,92 @@
+# In-flight Request Coalescing
+# Save as: singleflight.py
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class RequestCoalescer:
+    """Let concurrent identical requests share one in-flight call.
+
+    The first caller for a key (the leader) makes the call; anyone asking
+    for the same key before it finishes waits for that call and gets its
+    result (or its exception) instead of paying for a second completion.
+    Nothing is kept once the call is done, so this is not a cache. Sync
+    and async callers, on any thread or event loop, share the same calls.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = {}  # key -> concurrent.futures.Future of the leader's call
+        self.calls = 0
+        self.coalesced = 0
+
+    def _join(self, key):
+        """(future, is_leader) for a key, registering a new call if none is in flight"""
+        with self.lock:
+            future = self.in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = self.in_flight[key] = Future()
+            self.calls += 1
+            return future, True
+
+    def _finish(self, key, future, result=None, error=None):
+        # Unregister first, so a request arriving from now on starts a fresh call
+        with self.lock:
+            del self.in_flight[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, call):
+        """Run call() unless an identical one is in flight; returns (result, shared)"""
+        future, leader = self._join(key)
+        if not leader:
+            return future.result(), True
+        try:
+            result = call()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result, False
+
+    async def do_async(self, key, call):
+        """Async version of do; call is a coroutine function"""
+        future, leader = self._join(key)
+        if not leader:
+            # Shielded, so a cancelled follower can't cancel the call for everyone else
+            return await asyncio.shield(asyncio.wrap_future(future)), True
+        try:
+            result = await call()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result, False
+
+    def stats(self):
+        """Calls made and identical requests that rode along on one of them"""
+        with self.lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "in_flight": len(self.in_flight)
+            }
+
+
+_shared_coalescer = None
+_shared_lock = threading.Lock()
+
+
+def shared_coalescer():
+    """The process-wide coalescer, so every agent in a process shares in-flight calls"""
+    global _shared_coalescer
+    with _shared_lock:
+        if _shared_coalescer is None:
+            _shared_coalescer = RequestCoalescer()
+        return _shared_coalescer
@@ -0,0 +1,174 @@
+# Structured Output Schemas and Validation
+# Save as: structured_output.py
+
+import json
+
+OPPORTUNITY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "keyword": {"type": "string", "description": "specific trend"},
+        "score": {"type": "number", "description": "opportunity score 0-100"},
+        "opportunity": {"type": "string", "description": "high, medium or low"},
+        "price": {"type": "number", "description": "suggested price in USD"},
+        "audience": {"type": "string", "description": "target buyer"},
+        "reasoning": {"type": "string", "description": "why profitable"}
+    },
+    "required": ["keyword", "score", "opportunity", "price", "audience", "reasoning"]
+}
+
+PRODUCT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string", "description": "catchy product title"},
+        "description": {"type": "string", "description": "sales copy description"},
+        "outline": {"type": "array", "items": {"type": "string"}, "minItems": 10},
+        "sample_content": {"type": "string", "description": "first chapter, 500+ words"},
+        "keywords": {"type": "array", "items": {"type": "string"}, "minItems": 1},
+        "platforms": {"type": "array", "items": {"type": "string"}, "minItems": 1}
+    },
+    "required": ["title", "description", "outline", "sample_content", "keywords", "platforms"]
+}
+
+LISTINGS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "etsy": {
+            "type": "object",
+            "properties": {
+                "title": {"type": "string", "maxLength": 140},
+                "tags": {"type": "array", "items": {"type": "string"}, "minItems": 1},
+                "description": {"type": "string"}
+            },
+            "required": ["title", "tags", "description"]
+        },
+        "gumroad": {
+            "type": "object",
+            "properties": {
+                "title": {"type": "string"},
+                "description": {"type": "string"}
+            },
+            "required": ["title", "description"]
+        }
+    },
+    "required": ["etsy", "gumroad"]
+}
+
+# What each pipeline stage must return
+SCHEMAS = {
+    "opportunities": {"type": "array", "items": OPPORTUNITY_SCHEMA, "minItems": 1},
+    "product": PRODUCT_SCHEMA,
+    "listings": LISTINGS_SCHEMA
+}
+
+# Tool definitions that force the model to answer in the schema
+TOOLS = {
+    "opportunities": {
+        "name": "record_opportunities",
+        "description": "Record the digital product opportunities you found.",
+        "input_schema": {
+            "type": "object",
+            "properties": {"opportunities": SCHEMAS["opportunities"]},
+            "required": ["opportunities"]
+        }
+    },
+    "product": {
+        "name": "record_product",
+        "description": "Record the complete digital product.",
+        "input_schema": PRODUCT_SCHEMA
+    },
+    "listings": {
+        "name": "record_listings",
+        "description": "Record the marketplace listings.",
+        "input_schema": LISTINGS_SCHEMA
+    }
+}
+
+TYPE_CHECKS = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool)
+}
+
+
+def tool_params(stage):
+    """Extra Messages API parameters that force a schema-shaped tool call"""
+    tool = TOOLS[stage]
+    return {"tools": [tool], "tool_choice": {"type": "tool", "name": tool["name"]}}
+
+
+def validate(value, schema, path="$"):
+    """Check `value` against the subset of JSON Schema used here; returns a list of problems"""
+    expected = schema.get("type")
+    if expected and not TYPE_CHECKS[expected](value):
+        return [(path, f"expected {expected}")]
+
+    problems = []
+    if expected == "object":
+        properties = schema.get("properties", {})
+        for name in schema.get("required", []):
+            if name not in value:
+                problems.append((f"{path}.{name}", "missing"))
+        for name, sub_schema in properties.items():
+            if name in value:
+                problems.extend(validate(value[name], sub_schema, f"{path}.{name}"))
+    elif expected == "array":
+        if len(value) < schema.get("minItems", 0):
+            problems.append((path, f"expected at least {schema['minItems']} items"))
+        if "items" in schema:
+            for i, item in enumerate(value):
+                problems.extend(validate(item, schema["items"], f"{path}[{i}]"))
+    elif expected == "string":
+        if "maxLength" in schema and len(value) > schema["maxLength"]:
+            problems.append((path, f"longer than {schema['maxLength']} characters"))
+        if "enum" in schema and value not in schema["enum"]:
+            problems.append((path, f"not one of {schema['enum']}"))
+
+    return problems
+
+
+def invalid_fields(problems):
+    """Top-level field names touched by a list of validate() problems"""
+    fields = []
+    for path, _ in problems:
+        name = path[2:].split(".")[0].split("[")[0]
+        if name and name not in fields:
+            fields.append(name)
+    return fields
+
+
+def repair_tool(stage, fields):
+    """A tool that only asks for the listed top-level fields of a stage"""
+    schema = SCHEMAS[stage]
+    return {
+        "name": f"{TOOLS[stage]['name']}_fields",
+        "description": "Record only the requested fields.",
+        "input_schema": {
+            "type": "object",
+            "properties": {name: schema["properties"][name] for name in fields},
+            "required": list(fields)
+        }
+    }
+
+
+def repair_prompt(original_prompt, partial, problems, max_chars=400):
+    """Re-ask for just the broken fields, showing the rest of the answer for context"""
+    # Long fields (the sample chapter) only need a hint, not the full text
+    context = {
+        key: (value[:max_chars] + "...") if isinstance(value, str) and len(value) > max_chars else value
+        for key, value in partial.items()
+    }
+    issues = "\n".join(f"- {path[2:]}: {problem}" for path, problem in problems)
+
+    return f"""{original_prompt}
+
+A previous answer to this request had these problems:
+{issues}
+
+Here is the rest of that answer, which is fine and must stay consistent:
+{json.dumps(context, indent=2)}
+
+Return ONLY the fields listed above, fixed.
+"""
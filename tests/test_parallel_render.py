@@ -0,0 +1,24 @@
+import os
+
+import pytest
+
+from parallel_render import render_products
+
+
+def product(price):
+    return {"opportunity": {"keyword": "budget planner", "price": price},
+            "product": {"title": "Budget Planner", "description": "Plan every month"}}
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_one_failing_product_does_not_stop_the_batch(tmp_path, capsys, workers):
+    # The middle product has no price, so every template of it raises
+    products = [(1, product(9)), (2, {"opportunity": {}}), (3, product(12))]
+
+    rendered = render_products("etsy_image", iter(products), str(tmp_path), workers=workers)
+
+    assert rendered == 2
+    assert os.listdir(tmp_path / "product_1")
+    assert os.listdir(tmp_path / "product_3")
+    assert not os.listdir(tmp_path / "product_2")
+    assert "Could not render product 2" in capsys.readouterr().out
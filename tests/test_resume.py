@@ -0,0 +1,38 @@
+from digital_agent import SimpleProductAgent
+from fake_anthropic import CANNED_LISTINGS, CANNED_OPPORTUNITIES, FakeAnthropicServer
+from journal import CycleJournal
+from product_store import ProductStore
+from rate_limiter import RateLimiter
+
+
+def product(title):
+    return {"title": title, "description": "A planner", "outline": ["Week one"],
+            "sample_content": "Plan the week."}
+
+
+def test_resume_finishes_only_what_the_journal_left(tmp_path):
+    # A default run (max_products=2) crashed after finishing the best opportunity
+    # and creating, but not listing, the second one
+    path = str(tmp_path / "cycle.journal.jsonl")
+    journal = CycleJournal(path)
+    journal.record_opportunities(CANNED_OPPORTUNITIES)
+    journal.record_product(0, product("First"))
+    journal.record_listings(0, CANNED_LISTINGS)
+    journal.record_product(1, product("Second"))
+    journal.close()
+
+    store = ProductStore(str(tmp_path / "products.db"))
+    with FakeAnthropicServer(seed=1) as server:
+        agent = SimpleProductAgent("test-key", base_url=server.base_url, store=store,
+                                   rate_limiter=RateLimiter(requests_per_minute=100000,
+                                                            tokens_per_minute=100000000))
+        agent.run_full_cycle(CycleJournal(path))
+        # Only the second product's listings were missing
+        assert server.request_count == 1
+
+    resumed = CycleJournal(path)
+    assert resumed.done == {0, 1}
+    assert resumed.created == {0, 1}
+    resumed.close()
+    assert len(store.find_products()) == 2
+    store.close()
@@ -0,0 +1,83 @@
+# Priority Work Queue and Cycle Budget
+# Save as: work_queue.py
+
+import heapq
+import time
+
+OPPORTUNITY_WEIGHTS = {"high": 1.0, "medium": 0.7, "low": 0.4}
+
+
+def weighted_priority(score_weight=1.0, price_weight=0.5, opportunity_weights=None):
+    """Build a priority function of an opportunity's score, price and opportunity level"""
+    weights = opportunity_weights or OPPORTUNITY_WEIGHTS
+
+    def priority(opportunity):
+        level = str(opportunity.get('opportunity', '')).lower()
+        score = float(opportunity.get('score') or 0)
+        price = float(opportunity.get('price') or 0)
+        return (score_weight * score + price_weight * price) * weights.get(level, 0.5)
+
+    return priority
+
+
+class Budget:
+    """Stop a cycle after a number of products, tokens or seconds (None = unlimited)"""
+
+    def __init__(self, max_products=None, max_tokens=None, max_seconds=None):
+        self.max_products = max_products
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+        self.started_at = time.monotonic()
+        self.claimed = 0
+        self.stopped = False
+
+    def start(self, claimed=0):
+        """Restart the clock; `claimed` products (finished by a resumed journal) count as used"""
+        self.started_at = time.monotonic()
+        self.claimed = claimed
+        self.stopped = False
+        return self
+
+    def stop(self):
+        """Claim no more products; ones already claimed still finish (graceful drain)"""
+        self.stopped = True
+
+    def exhausted(self, tokens_used=0):
+        """Name of the limit that has run out, or None"""
+        if self.stopped:
+            return "stopped"
+        if self.max_products is not None and self.claimed >= self.max_products:
+            return "max_products"
+        if self.max_tokens is not None and tokens_used >= self.max_tokens:
+            return "max_tokens"
+        if self.max_seconds is not None and time.monotonic() - self.started_at >= self.max_seconds:
+            return "max_wallclock"
+        return None
+
+    def __repr__(self):
+        return (f"Budget(max_products={self.max_products}, max_tokens={self.max_tokens}, "
+                f"max_seconds={self.max_seconds})")
+
+
+class OpportunityQueue:
+    """Max-priority queue of (index, opportunity) pairs, drained under a Budget"""
+
+    def __init__(self, opportunities, priority=None, skip=()):
+        priority = priority or weighted_priority()
+        # The index breaks ties so equal priorities keep their original order
+        self.heap = [(-priority(opp), i, opp) for i, opp in enumerate(opportunities) if i not in skip]
+        heapq.heapify(self.heap)
+
+    def __len__(self):
+        return len(self.heap)
+
+    def pop(self, budget, tokens_used=0):
+        """Next (index, opportunity) if the budget allows another product, else None"""
+        if not self.heap:
+            return None
+        if budget.exhausted(tokens_used):
+            return None
+
+        budget.claimed += 1
+        _, index, opportunity = heapq.heappop(self.heap)
+        return index, opportunity
@@ -0,0 +1,309 @@
+# Multi-process Product Worker Pool
+# Save as: worker_pool.py
+
+import argparse
+import multiprocessing
+import os
+import queue as queue_module
+import signal
+import time
+from datetime import datetime
+
+from http_pool import configure_pool
+from journal import CycleJournal
+from llm_cache import ResponseCache
+from model_router import ModelRouter, load_routes
+from product_store import ProductStore
+from rate_limiter import SharedRateLimiter
+from work_queue import Budget, OpportunityQueue
+
+
+def worker_main(worker_id, api_key, options, rate_limiter, jobs, results):
+    """One worker process: LLM product + listings, store, then PDF and images, per job"""
+    # Ctrl+C is handled by the parent, which drains the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    from digital_agent import SimpleProductAgent
+
+    configure_pool(max_connections=options["max_connections"],
+                   max_keepalive_connections=min(20, options["max_connections"]),
+                   http2=options["http2"])
+    store = ProductStore(options["db"])
+    agent = SimpleProductAgent(
+        api_key, rate_limiter=rate_limiter, base_url=options["base_url"],
+        structured_output=options["structured"],
+        cache=ResponseCache(options["cache_dir"]) if options["cache_dir"] else None,
+        store=store, router=ModelRouter(load_routes(options["routes"])))
+    renderer = None
+    if options["render"]:
+        from image_layers import configure_layers
+        from render_pipeline import ProductRenderer
+        # Workers share static template layers through the directory, if one is set
+        configure_layers(directory=options["layer_cache"])
+        renderer = ProductRenderer(store)
+
+    completed = 0
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        index, opportunity, product = job
+        tokens_before = agent.tokens_used()
+        try:
+            if product is None:
+                product = agent.create_product(opportunity)
+                if not product:
+                    results.put(("failed", index, agent.tokens_used() - tokens_before))
+                    continue
+                results.put(("product", index, product))
+
+            listings = agent.create_listings(product, opportunity['price'])
+            complete_product = {
+                "opportunity": opportunity,
+                "product": product,
+                "listings": listings,
+                "created_at": datetime.now().isoformat()
+            }
+            product_id = agent.save_to_store([opportunity], [complete_product])[0]
+            # Journaled as soon as it is stored, so a resume never saves it twice
+            completed += 1
+            results.put(("done", index, listings, product_id, agent.tokens_used() - tokens_before))
+            print(f"✅ Worker {worker_id}: product {product_id} done ({product['title']})")
+        except Exception as e:
+            print(f"❌ Worker {worker_id} error on opportunity {index}: {e}")
+            results.put(("failed", index, agent.tokens_used() - tokens_before))
+            continue
+
+        if renderer is not None:
+            try:
+                renderer.render(complete_product,
+                                os.path.join(options["output_dir"], f"product_{product_id}"),
+                                product_id)
+            except Exception as e:
+                print(f"⚠️ Worker {worker_id}: could not render product {product_id}: {e}")
+
+    base = options["metrics_base"]
+    agent.metrics.export(f"{base}.worker{worker_id}.metrics.prom",
+                         f"{base}.worker{worker_id}.metrics.json")
+    results.put(("exit", worker_id, completed, agent.usage))
+    store.close()
+
+
+class WorkerPool:
+    """Run a product cycle across N worker processes with one shared rate limit.
+
+    The parent scans opportunities once, then hands out the best remaining
+    opportunity whenever a worker is free, so priority order and the budget
+    hold just as in a single process. Each worker runs the whole chain for
+    its product (product, listings, store, PDF, images), so LLM waits and
+    rendering CPU overlap across cores. All processes draw from one
+    SharedRateLimiter. Finished products are journaled by the parent, so an
+    interrupted pool resumes like any other cycle.
+    """
+
+    def __init__(self, api_key, workers=None, base_url=None, db="products.db",
+                 output_dir="products", render=True, structured=False, cache_dir=None,
+                 niches=None, ideas_per_niche=10, requests_per_minute=50,
+                 tokens_per_minute=40000, max_connections=100, http2=True, routes=None,
+                 layer_cache=None):
+        self.api_key = api_key
+        self.workers = workers or os.cpu_count() or 1
+        # spawn: workers start clean instead of inheriting the parent's HTTP clients and threads
+        self.context = multiprocessing.get_context("spawn")
+        self.rate_limiter = SharedRateLimiter(requests_per_minute, tokens_per_minute, self.context)
+        self.niches = niches
+        self.ideas_per_niche = ideas_per_niche
+        self.options = {
+            "base_url": base_url,
+            "db": db,
+            "output_dir": output_dir,
+            "render": render,
+            "layer_cache": layer_cache,
+            "structured": structured,
+            "routes": routes,
+            "cache_dir": cache_dir,
+            "max_connections": max_connections,
+            "http2": http2
+        }
+
+    def scan_agent(self):
+        """In-process agent for the opportunity scan"""
+        from digital_agent import SimpleProductAgent
+
+        return SimpleProductAgent(
+            self.api_key, rate_limiter=self.rate_limiter, base_url=self.options["base_url"],
+            structured_output=self.options["structured"],
+            cache=ResponseCache(self.options["cache_dir"]) if self.options["cache_dir"] else None,
+            niches=self.niches, ideas_per_niche=self.ideas_per_niche,
+            router=ModelRouter(load_routes(self.options["routes"])))
+
+    def start_workers(self, jobs, results, metrics_base):
+        options = dict(self.options, metrics_base=metrics_base)
+        processes = []
+        for worker_id in range(self.workers):
+            process = self.context.Process(
+                target=worker_main, name=f"product-worker-{worker_id}", daemon=True,
+                args=(worker_id, self.api_key, options, self.rate_limiter, jobs, results))
+            process.start()
+            processes.append(process)
+        return processes
+
+    def run(self, journal=None, budget=None, priority=None):
+        """Run one cycle; returns the ids of the stored products"""
+        started = time.monotonic()
+        agent = self.scan_agent()
+        journal = journal or agent.new_journal()
+        # Products a resumed journal already finished count against max_products
+        budget = (budget or Budget()).start(len(journal.done))
+        print(f"🚀 Starting Multi-process Digital Product Creation Cycle ({self.workers} workers)...")
+        print("=" * 50)
+
+        opportunities = agent.load_opportunities(journal)
+        if not opportunities:
+            print("❌ No opportunities found. Exiting.")
+            journal.close()
+            return []
+
+        base = journal.path[:-len(".journal.jsonl")] if journal.path.endswith(".journal.jsonl") else journal.path
+        opportunity_queue = OpportunityQueue(opportunities, priority, skip=journal.done)
+        jobs = self.context.Queue()
+        results = self.context.Queue()
+        processes = self.start_workers(jobs, results, base)
+
+        tokens_used = agent.tokens_used()
+        product_ids = []
+        failed = 0
+        in_flight = 0
+
+        def dispatch():
+            item = opportunity_queue.pop(budget, tokens_used)
+            if item is None:
+                return False
+            index, opportunity = item
+            jobs.put((index, opportunity, journal.products.get(index)))
+            return True
+
+        # One job per worker at a time, so the best opportunities go out first
+        while in_flight < self.workers and dispatch():
+            in_flight += 1
+
+        try:
+            while in_flight:
+                try:
+                    message = results.get(timeout=1.0)
+                except queue_module.Empty:
+                    if not any(process.is_alive() for process in processes):
+                        print("❌ All workers exited with work outstanding")
+                        break
+                    continue
+                except KeyboardInterrupt:
+                    if budget.stopped:
+                        raise
+                    print("\n🛑 Stopping: finishing in-flight products (Ctrl+C again to abort)...")
+                    budget.stop()
+                    continue
+
+                kind, index = message[0], message[1]
+                if kind == "product":
+                    journal.record_product(index, message[2])
+                    continue
+
+                in_flight -= 1
+                tokens_used += message[-1]
+                if kind == "done":
+                    journal.record_listings(index, message[2])
+                    product_ids.append(message[3])
+                else:
+                    failed += 1
+                if dispatch():
+                    in_flight += 1
+        finally:
+            self.stop_workers(processes, jobs, results)
+            journal.close()
+
+        agent.report_budget(opportunity_queue, budget)
+        self.report(product_ids, failed, tokens_used, time.monotonic() - started, journal.path)
+        return product_ids
+
+    def stop_workers(self, processes, jobs, results):
+        """Send every worker its stop sentinel and collect their exit reports"""
+        for _ in processes:
+            jobs.put(None)
+        exited = 0
+        deadline = time.monotonic() + 60
+        while exited < len(processes) and time.monotonic() < deadline:
+            try:
+                message = results.get(timeout=1.0)
+            except queue_module.Empty:
+                if not any(process.is_alive() for process in processes):
+                    break
+                continue
+            if message[0] == "exit":
+                exited += 1
+                print(f"👷 Worker {message[1]}: {message[2]} products, usage {message[3]}")
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    def report(self, product_ids, failed, tokens_used, seconds, journal_path):
+        print("\n🎉 CYCLE COMPLETE!")
+        print(f"📊 Created {len(product_ids)} complete products ({failed} failed) "
+              f"with {self.workers} workers in {seconds:.1f}s "
+              f"({len(product_ids) / max(seconds, 1e-9) * 60:.1f} products/min)")
+        if product_ids:
+            print(f"🗄️ Saved to: {self.options['db']} (ids {', '.join(map(str, product_ids))})")
+        print(f"🧾 Tokens: {tokens_used}")
+        print(f"⏱️ Shared rate limiter: {self.rate_limiter.stats()}")
+        print(f"📓 Journal: {journal_path} (resume with --resume {journal_path})")
+
+
+def main():
+    from digital_agent import load_niches
+
+    parser = argparse.ArgumentParser(description="Run product cycles across worker processes")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="worker processes (default: one per core)")
+    parser.add_argument("--base-url", help="API base URL (e.g. a local fake_anthropic.py server)")
+    parser.add_argument("--db", default="products.db")
+    parser.add_argument("--output-dir", default="products",
+                        help="per-product PDF and image folders go here")
+    parser.add_argument("--no-render", action="store_true", help="skip the PDF and images")
+    parser.add_argument("--layer-cache", metavar="DIR",
+                        help="static image template layers shared by the workers (PNG files)")
+    parser.add_argument("--structured", action="store_true")
+    parser.add_argument("--cache", metavar="DIR")
+    parser.add_argument("--routes", metavar="PRESET_OR_FILE",
+                        help="model routing: 'single', 'tiered' or a routes JSON file")
+    parser.add_argument("--niches", metavar="FILE_OR_LIST")
+    parser.add_argument("--ideas-per-niche", type=int, default=10)
+    parser.add_argument("--max-products", type=int)
+    parser.add_argument("--max-tokens", type=int)
+    parser.add_argument("--max-minutes", type=float)
+    parser.add_argument("--requests-per-minute", type=float, default=50,
+                        help="shared by all workers")
+    parser.add_argument("--tokens-per-minute", type=float, default=40000,
+                        help="shared by all workers")
+    parser.add_argument("--no-http2", action="store_true")
+    parser.add_argument("--resume", metavar="JOURNAL")
+    args = parser.parse_args()
+
+    api_key = os.environ.get("ANTHROPIC_API_KEY", "").strip()
+    if not api_key:
+        print("❌ API key is required! Set ANTHROPIC_API_KEY")
+        return
+
+    pool = WorkerPool(api_key, args.workers, base_url=args.base_url, db=args.db,
+                      output_dir=args.output_dir, render=not args.no_render,
+                      structured=args.structured, cache_dir=args.cache, routes=args.routes,
+                      layer_cache=args.layer_cache,
+                      niches=load_niches(args.niches), ideas_per_niche=args.ideas_per_niche,
+                      requests_per_minute=args.requests_per_minute,
+                      tokens_per_minute=args.tokens_per_minute, http2=not args.no_http2)
+    budget = Budget(args.max_products, args.max_tokens,
+                    args.max_minutes * 60 if args.max_minutes else None)
+    pool.run(CycleJournal(args.resume) if args.resume else None, budget)
+
+
+if __name__ == "__main__":
+    main()